@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time to read the type, sections and symbols of the shipped ELF objects.
+"lief" is lief.parse followed by ELFFile.from_lief (the fallback of ELFBase.run),
+"native" is ELFFile.parse over the mapped file. Files ELFFile.parse rejects
+(the broken objects of the patch levels) are reported and skipped.
+Needs lief.
+
+Usage: python benchmarks/elf_reader.py [--repeat N] [FILE ...]
+"""
+
+import argparse
+import mmap
+import pathlib
+import sys
+import time
+
+import lief
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import run
+
+def read_lief(path: pathlib.Path):
+    return run.ELFFile.from_lief(lief.parse(str(path)))
+
+def read_native(path: pathlib.Path):
+    with open(path, 'rb') as f:
+        image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return run.ELFFile.parse(memoryview(image))
+
+def measure(read, path: pathlib.Path, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", type=pathlib.Path)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    lief.logging.disable()
+    files = args.files or sorted(ROOT.glob("*/level*/*.o"))
+
+    print(f"{'file':<24} {'symbols':>8} {'lief (ms)':>10} {'native (ms)':>12} {'speedup':>8}")
+    for path in files:
+        try:
+            symbols = len(read_native(path).symbols)
+        except run.ELFFormatError as e:
+            print(f"{path.name:<24} skipped, {e}")
+            continue
+        parsed = measure(read_lief, path, args.repeat)
+        native = measure(read_native, path, args.repeat)
+        print(f"{path.name:<24} {symbols:>8} {parsed * 1000:>10.3f} {native * 1000:>12.3f} {parsed / native:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
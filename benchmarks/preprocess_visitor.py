@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Traversal time of PreprocessAnalyzeBase on large synthetic C files.
+"legacy" replays the old per-cursor pattern (every find_* handler re-checks the
+node type and re-decodes the node text), "dispatch" is PreprocessAnalyzeBase.run.
+Needs tree_sitter and the C grammar (/challenge/c-language.so by default).
+
+Usage: python benchmarks/preprocess_visitor.py [--lines 1000 10000 50000] [--language PATH]
+"""
+
+import argparse
+import contextlib
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+import run
+
+LEGACY_HANDLERS = [
+    (["preproc_def"], "find_constant_define"),
+    (["identifier", "preproc_arg", "type_identifier"], "find_constant_define_use"),
+    (["preproc_function_def"], "find_function_define"),
+    (["identifier"], "find_function_define_use"),
+]
+
+def synthetic_source(lines: int) -> str:
+    code = [
+        "#include <stdio.h>",
+        "#define COUNT 90",
+        "#define PASS_GRADE 60",
+        "#define BANNER \"v\" \"1.0\"",
+        "#define MAX(a, b) ((a) > (b) ? (a) : (b))",
+    ]
+    function = 0
+    while len(code) < lines:
+        code += [
+            f"int function_{function}(int variable_{function}) {{",
+            f"    int result = MAX(variable_{function}, PASS_GRADE);",
+            "    for (int i = 0; i < COUNT; i++) {",
+            f"        result += i * variable_{function};",
+            "    }",
+            "    printf(\"%s %d\\n\", BANNER, result);",
+            "    return result;",
+            "}",
+        ]
+        function += 1
+    return "\n".join(code) + "\n"
+
+def legacy_traverse(analyzer: run.PreprocessAnalyzeBase):
+    for cursor in analyzer.traverse_tree("depth_first"):
+        for node_types, handler in LEGACY_HANDLERS:
+            if cursor.node.type in node_types:
+                getattr(analyzer, handler)(cursor.node, cursor.node.text.decode('utf-8').strip())
+
+def dispatch_traverse(analyzer: run.PreprocessAnalyzeBase):
+    for cursor in analyzer.traverse_tree("depth_first"):
+        analyzer.visit(cursor.node)
+
+def measure(traverse, source: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        analyzer = run.PreprocessAnalyzeBase()
+        with run.c_parsers.parser() as parser:
+            analyzer.tree = parser.parse(source.encode('utf-8'))
+        start = time.perf_counter()
+        traverse(analyzer)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--language", default=run.c_parsers.language_path)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run.c_parsers = run.ParserPool(str(pathlib.Path(args.language).resolve()), "c")
+
+    print(f"{'lines':>8} {'legacy (ms)':>12} {'dispatch (ms)':>14} {'speedup':>8}")
+    for lines in args.lines:
+        source = synthetic_source(lines)
+        # the handlers report every finding, keep the terminal out of the timing
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            legacy = measure(legacy_traverse, source, args.repeat)
+            dispatch = measure(dispatch_traverse, source, args.repeat)
+        print(f"{lines:>8} {legacy * 1000:>12.1f} {dispatch * 1000:>14.1f} {legacy / dispatch:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
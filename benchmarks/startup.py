@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup time of the checker per level family.
+Every sample is a fresh interpreter which imports run.py and looks up one level
+of the family, "lazy" only imports what the family needs, "eager" imports
+tree_sitter and lief for every level like run.py used to do.
+
+Usage: python benchmarks/startup.py [--repeat N]
+"""
+
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# one representative level of every family, and the modules its checks import
+FAMILIES = {
+    "preprocess": (2, ["tree_sitter"]),
+    "compilation": (9, []),
+    "assembly": (26, []),
+    "linking": (35, []),
+    "execution": (41, []),
+}
+
+ALL_MODULES = ["tree_sitter", "lief"]
+
+def sample(level: int, modules: List[str]) -> float:
+    code = f"import sys; sys.path.insert(0, {str(ROOT)!r}); import run; "
+    code += "".join(f"import {module}; " for module in modules)
+    code += f"run.level_class({level})"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'family':<12} {'eager (ms)':>10} {'lazy (ms)':>10} {'saved (ms)':>10}")
+    for family, (level, modules) in FAMILIES.items():
+        eager = statistics.median(sample(level, ALL_MODULES) for _ in range(args.repeat)) * 1000
+        lazy = statistics.median(sample(level, modules) for _ in range(args.repeat)) * 1000
+        print(f"{family:<12} {eager:>10.1f} {lazy:>10.1f} {eager - lazy:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,60 +3,219 @@
 # Author: h1k0
 # Created: 2023-05-17
 
+from __future__ import annotations
+
 import sys
 import os
 import textwrap
 import pathlib
-import tree_sitter
 import subprocess
-import readline
 import glob
-import difflib
 import signal
 import time
+import collections
+import atexit
+import re
+from typing import List, Dict, Tuple, Callable, TYPE_CHECKING
+import traceback
+import socket
+import struct
+import argparse
+import threading
+import json
+import io
+import contextlib
+import multiprocessing
+import concurrent.futures
+import readline
 import tempfile
-import lief
 import hashlib
-from tree_sitter import Language, Parser
-from typing import List, Dict, Tuple
-import traceback
+import shutil
+import fcntl
+import bisect
+import mmap
+import select
+import selectors
+
+# tree_sitter and lief are imported by the code using them, so ELF levels don't pay
+# for tree_sitter and preprocess levels don't pay for lief
+if TYPE_CHECKING:
+    import tree_sitter
+
+class CheckResult():
+    """
+    Verdict of a check, with the reason of failure and the diagnostic text (diff, compiler errors, ...)
+    Only the CLI wrapper turns it into an exit code and the sesame.
+    timings holds (wall time, sequential time) of the CheckScheduler runs behind it.
+    """
+    def __init__(self, passed: bool, reason: str = "", diagnostic: str = ""):
+        self.passed = passed
+        self.reason = reason
+        self.diagnostic = diagnostic
+        self.timings = []
+
+    def __bool__(self):
+        return self.passed
+
+    def __repr__(self):
+        return f"CheckResult(passed={self.passed}, reason={self.reason!r})"
+
+    @classmethod
+    def all(cls, results: List["CheckResult"]) -> "CheckResult":
+        """
+        Merge results of independent checks, every failure is kept
+        """
+        failures = [result for result in results if not result]
+        if not failures:
+            merged = cls(True)
+        else:
+            merged = cls(False,
+                         "\n".join(result.reason for result in failures if result.reason),
+                         "\n".join(result.diagnostic for result in failures if result.diagnostic))
+        merged.timings = [timing for result in results for timing in result.timings]
+        return merged
+
+class CheckError(Exception):
+    """
+    Raised when a check can not go on (file not found, tool can not run, ...)
+    """
+    def __init__(self, reason: str, diagnostic: str = ""):
+        super().__init__(reason)
+        self.result = CheckResult(False, reason, diagnostic)
+
+class CheckScheduler():
+    """
+    Run the independent checks of a level concurrently on a thread pool and merge
+    every failure with CheckResult.all, a CheckError of one check is kept as its failure.
+    The wall time of the run and the sum of the time of every check are added to the
+    timings of the merged result.
+    Only worth it for checks waiting on subprocesses, lookups in the parsed binary are GIL-bound.
+    """
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+
+    def timed(self, check: Callable[[], CheckResult]) -> Tuple[CheckResult, float]:
+        start = time.perf_counter()
+        try:
+            result = check()
+        except CheckError as e:
+            result = e.result
+        return result, time.perf_counter() - start
+
+    def run(self, checks: List[Callable[[], CheckResult]],
+            merge: Callable[[List[CheckResult]], CheckResult] = CheckResult.all) -> CheckResult:
+        """
+        merge gets the results in the order of the checks
+        """
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers or len(checks)) as executor:
+            outcomes = list(executor.map(self.timed, checks))
+        wall_time = time.perf_counter() - start
+        result = merge([result for result, _ in outcomes])
+        result.timings.append((wall_time, sum(elapsed for _, elapsed in outcomes)))
+        return result
 
-original_print = print
-def sanitized_print(*args, **kwargs):
+class OutputSink():
+    """
+    Buffered stdout of the checker. The buffer is scanned for the sesame once per flush
+    instead of on every print, the end of the last flush is kept so a sesame split
+    between two flushes is caught too.
+    In quiet mode (batch grading) the output is dropped without being scanned.
+    """
     dangerous = "sesame{"
-    for arg in args:
-        if type(arg) == str:
-            if dangerous in arg:
-                print("[-] being naughty? try harder")
-                sys.exit(1)
-    
-    for key, value in kwargs.items():
-        if type(value) == str:
-            if dangerous in value:
-                print("[-] being naughty? try harder")
-                sys.exit(1)
-    
-    original_print(*args, **kwargs)
+
+    def __init__(self, limit: int = 64 * 1024):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.tail = ""
+        self.quiet = False
+        # checks run by CheckScheduler print from several threads
+        self.lock = threading.RLock()
+
+    def write(self, text: str):
+        if self.quiet:
+            return
+        with self.lock:
+            self.parts.append(text)
+            self.size += len(text)
+            if self.size >= self.limit:
+                self.flush()
+
+    def scan(self, text: str):
+        if self.dangerous in self.tail + text:
+            self.tail = ""
+            raise CheckError("[-] being naughty? try harder")
+        self.tail = text[-(len(self.dangerous) - 1):]
+
+    def flush(self):
+        with self.lock:
+            if not self.parts:
+                return
+            text = "".join(self.parts)
+            self.parts = []
+            self.size = 0
+            self.scan(text)
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def close(self):
+        """
+        Flush at the end of a check, a naughty buffer is dropped
+        """
+        try:
+            self.flush()
+        except CheckError:
+            pass
+        self.tail = ""
+
+output = OutputSink()
+atexit.register(output.close)
+
+def sanitized_print(*args, sep=" ", end="\n", file=None, flush=False):
+    text = (" " if sep is None else sep).join(str(arg) for arg in args) + ("\n" if end is None else end)
+    if file is None or file is sys.stdout:
+        output.write(text)
+        if flush:
+            output.flush()
+    else:
+        output.flush()
+        output.scan(text)
+        file.write(text)
+
+original_input = input
+def flushed_input(prompt: str = "") -> str:
+    # the prompt must not wait in the buffer
+    output.flush()
+    return original_input(prompt)
 
 print = sanitized_print
+input = flushed_input
 
 def completer(text, state):
     text = text.replace("~", os.path.expanduser("~"))
     return (glob.glob(text+'*')+[None])[state]
 
-# Change autocomplete settings
-readline.set_completer_delims('\t')
-readline.parse_and_bind("tab: complete")
-readline.set_completer(completer)
+def setup_completion():
+    """
+    Change autocomplete settings, only needed when a human is typing
+    """
+    readline.set_completer_delims('\t')
+    readline.parse_and_bind("tab: complete")
+    readline.set_completer(completer)
 
-config = (pathlib.Path(__file__).parent / ".config").read_text().strip()
-level = int(config)
+# the directory of the current level, `run` is a symlink to this file in every level directory
+challenge_dir = pathlib.Path(__file__).parent.resolve()
+config_path = challenge_dir / ".config"
+# the daemon is started outside of any level directory, it sets `level` per connection
+level = int(config_path.read_text().strip()) if config_path.exists() else None
 
 description = textwrap.dedent
 
 def get_sesame():
     # just like read flag
     sesame = pathlib.Path("/flag").read_text().strip()
+    output.flush()
     os.write(1, f"{sesame}\n".encode())
 
 def current_field_name(node: tree_sitter.Node) -> str:
@@ -77,13 +236,17 @@ def check_file_exists(path: str) -> bool:
     else:
         return True
 
+# given artifacts (level{N}.c, .ast, .ll, ...) preloaded by the checker daemon, keyed by path
+given_artifacts = {}
+
 def try_read_file(path: str) -> str:
+    if str(path) in given_artifacts:
+        return given_artifacts[str(path)]
     try:
         with open(path, "r") as f:
             return f.read()
     except:
-        print(f"Can not read content from file {path}")
-        sys.exit(1)
+        raise CheckError(f"Can not read content from file {path}")
 
 def strip_empty_line(code: str) -> str:
     lines = code.split('\n')
@@ -95,32 +258,661 @@ def strip_empty_line(code: str) -> str:
         new_lines.append(line)
     return '\n'.join(new_lines)
     
+# limits of every external tool (clang, opt, llc, ...) run by the checker
+COMMAND_TIMEOUT = 60
+OUTPUT_LIMIT = 16 * 1024 * 1024
+# how often a command is checked for having exited while its pipes are still open
+PROCESS_POLL_INTERVAL = 0.1
+
+def run_command(command: List[str], timeout: float = COMMAND_TIMEOUT, limit: int = OUTPUT_LIMIT) -> Tuple[bytes, bytes]:
+    """
+    Run a command and collect its stdout and stderr in memory.
+    Both pipes are drained concurrently, the command is killed if it runs longer than
+    `timeout` seconds or writes more than `limit` bytes to one of them.
+    """
+    if toolchain_pool is not None:
+        with toolchain_pool.slot(str(command[0])):
+            return run_process(command, timeout, limit)
+    return run_process(command, timeout, limit)
+
+def run_process(command: List[str], timeout: float, limit: int) -> Tuple[bytes, bytes]:
+    # a session of its own, so whatever the command leaves behind is killed with it
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               start_new_session=True)
+    stdout, stderr = process.stdout.fileno(), process.stderr.fileno()
+    outputs = {stdout: [], stderr: []}
+    sizes = dict.fromkeys(outputs, 0)
+    deadline = time.monotonic() + timeout
+    try:
+        with selectors.DefaultSelector() as selector:
+            for fd in outputs:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if process.poll() is None:
+                        raise CheckError(f"{command[0]} did not finish in {timeout} seconds !")
+                    # the command is done, something which left its process group holds the pipes
+                    break
+                for key, _ in selector.select(min(remaining, PROCESS_POLL_INTERVAL)):
+                    chunk = os.read(key.fd, 64 * 1024)
+                    if not chunk:
+                        selector.unregister(key.fd)
+                        continue
+                    sizes[key.fd] += len(chunk)
+                    if sizes[key.fd] > limit:
+                        raise CheckError(f"{command[0]} wrote more than {limit} bytes !")
+                    outputs[key.fd].append(chunk)
+                if process.poll() is not None:
+                    # children left behind may still hold the pipes open
+                    kill_process_group(process)
+        try:
+            process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            raise CheckError(f"{command[0]} did not finish in {timeout} seconds !")
+    finally:
+        kill_process_group(process)
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
+    return b"".join(outputs[stdout]), b"".join(outputs[stderr])
+
+def kill_process_group(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        # the group is gone already
+        pass
+
+def tool_fingerprint(tool: str) -> str:
+    """
+    Identity of an installed tool binary, None if it is not installed.
+    The inode is left out, it is not kept when an image is copied.
+    """
+    path = shutil.which(tool)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+# fraction of the bound the cache is evicted down to, so a full cache is not scanned on every write
+CACHE_LOW_WATER = 0.9
+
+class ToolchainCache():
+    """
+    On-disk cache of toolchain results, submissions are often resubmitted byte-for-byte.
+    An entry is keyed by the command line, the content of every file on it and the
+    identity of the tool binary, and holds the stdout/stderr of the command.
+    The cache is bounded to `max_size` bytes: `size` estimates the total from the last
+    scan of the directory and the entries written since, and once it exceeds the bound
+    the least recently used entries are evicted down to CACHE_LOW_WATER of it.
+    """
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.size = None
+
+    def key(self, command: List[str]) -> str:
+        """
+        Return None if the result may depend on something not on the command line
+        """
+        fingerprint = tool_fingerprint(str(command[0]))
+        if fingerprint is None:
+            return None
+        digest = hashlib.sha256(fingerprint.encode())
+        for arg in map(str, command):
+            digest.update(b"\0" + arg.encode())
+            if os.path.isfile(arg):
+                with open(arg, "rb") as f:
+                    content = f.read()
+                # `#include "..."`, `#include MACRO`, `__has_include(...)` may read other files
+                if re.search(rb"include\w*\s*\(?\s*[^\s<(]", content):
+                    return None
+                digest.update(b"\0" + hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Tuple[bytes, bytes]:
+        path = self.cache_dir / key
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        if len(data) < 8 or struct.unpack_from("!Q", data)[0] > len(data) - 8:
+            # truncated entry, drop it and run the command again
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        stdout_size = struct.unpack_from("!Q", data)[0]
+        return data[8:8 + stdout_size], data[8 + stdout_size:]
+
+    def put(self, key: str, stdout: bytes, stderr: bytes):
+        path = self.cache_dir / key
+        temp_path = self.cache_dir / f".{key}.{os.getpid()}.{threading.get_ident()}"
+        with open(temp_path, "wb") as f:
+            f.write(struct.pack("!Q", len(stdout)) + stdout + stderr)
+        os.replace(temp_path, path)
+        if self.size is None:
+            self.evict()
+        else:
+            self.size += 8 + len(stdout) + len(stderr)
+            if self.size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        """
+        Scan the directory, the other checker processes write to it too
+        """
+        entries = []
+        for path in self.cache_dir.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_size:
+            for _, size, path in sorted(entries):
+                if total <= self.max_size * CACHE_LOW_WATER:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+                total -= size
+        self.size = total
+
+# tools whose processes are queued by the toolchain pool
+POOL_TOOLS = ["clang-15", "opt-15", "llc-15"]
+# a waiter sleeps until it is woken, these bound the sleep if a wakeup is lost (dead process)
+POOL_MIN_WAIT = 0.01
+POOL_MAX_WAIT = 1.0
+POOL_WARM_INTERVAL = 300
+# "libLLVM-15.so.1 => /usr/lib/.../libLLVM-15.so.1 (0x...)" and "/lib64/ld-linux-x86-64.so.2 (0x...)"
+LDD_LIBRARY = re.compile(r"(/\S+) \(0x[0-9a-f]+\)")
+
+class ToolchainPool():
+    """
+    Bounds the concurrent processes of every tool in daemon and batch mode, across all
+    checker processes sharing `state_dir`. A tool has `jobs` slots (flock'ed lock files),
+    the processes waiting for a slot are queued in the state file of the tool and levels
+    are served round-robin, so a burst of submissions of one level does not starve the others.
+    A waiter sleeps on its own FIFO, the waiter whose turn it is is woken when a slot is
+    released or taken. The kernel drops the lock of a dead process, dead waiters are
+    swept out of the queue when a slot is released or a wait times out.
+    The tools are kept in the page cache by running them once (`--version`) and asking
+    the kernel to read their binary and shared libraries (libLLVM, libclang-cpp, where
+    their startup goes) again every POOL_WARM_INTERVAL seconds.
+    """
+    def __init__(self, state_dir: str, jobs: int, tools: List[str] = POOL_TOOLS):
+        self.state_dir = pathlib.Path(state_dir)
+        self.state_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.jobs = jobs
+        self.tools = tools
+        self.warmed = None
+        self.warm_files = []
+
+    def tool_files(self, path: str) -> List[str]:
+        """
+        The binary of a tool and the shared libraries it loads
+        """
+        files = [os.path.realpath(path)]
+        try:
+            stdout, _ = run_command(["ldd", path])
+        except (CheckError, OSError):
+            return files
+        return files + [os.path.realpath(library) for library in LDD_LIBRARY.findall(stdout.decode('utf-8', 'replace'))]
+
+    def warm_up(self):
+        if self.warmed is None:
+            for tool in self.tools:
+                path = shutil.which(tool)
+                if path is None:
+                    continue
+                # maps the tool and its shared libraries once
+                try:
+                    run_command([path, "--version"])
+                except (CheckError, OSError):
+                    pass
+                self.warm_files += self.tool_files(path)
+            self.warm_files = list(dict.fromkeys(self.warm_files))
+        for path in self.warm_files:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        self.warmed = time.monotonic()
+
+    def warm_up_due(self) -> bool:
+        return self.warmed is None or time.monotonic() - self.warmed > POOL_WARM_INTERVAL
+
+    def alive(self, pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def sweep(self, tool: str, state: Dict):
+        """
+        Drop the dead waiters and their FIFO
+        """
+        alive = []
+        for waiter in state["queue"]:
+            if self.alive(waiter[0]):
+                alive.append(waiter)
+            else:
+                self.wakeup_path(tool, waiter).unlink(missing_ok=True)
+        state["queue"] = alive
+
+    def next_waiter(self, state: Dict) -> List[int]:
+        """
+        The first waiter of the level after the last served one
+        """
+        levels = sorted({waiter[2] for waiter in state["queue"]})
+        later = [queued_level for queued_level in levels if queued_level > state["last"]]
+        turn = (later or levels)[0]
+        return next(waiter for waiter in state["queue"] if waiter[2] == turn)
+
+    def wakeup_path(self, tool: str, waiter: List[int]) -> pathlib.Path:
+        return self.state_dir / f"{tool}.{waiter[0]}.{waiter[1]}.wakeup"
+
+    def wake_next(self, tool: str, state: Dict):
+        """
+        Wake the waiter whose turn it is, it takes a slot if one is free
+        """
+        if not state["queue"]:
+            return
+        try:
+            fd = os.open(self.wakeup_path(tool, self.next_waiter(state)), os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            # the waiter is gone, it is swept later
+            return
+        try:
+            os.write(fd, b"\0")
+        except BlockingIOError:
+            # woken many times already
+            pass
+        finally:
+            os.close(fd)
+
+    def try_slot(self, tool: str):
+        for index in range(self.jobs):
+            slot = open(self.state_dir / f"{tool}.{index}.lock", "a")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except BlockingIOError:
+                slot.close()
+        return None
+
+    def update_queue(self, tool: str, update: Callable[[Dict], object]):
+        # opened per call: flock on a shared open file would not exclude the other threads
+        with open(self.state_dir / f"{tool}.queue", "a+") as queue_file:
+            fcntl.flock(queue_file, fcntl.LOCK_EX)
+            queue_file.seek(0)
+            text = queue_file.read()
+            state = json.loads(text) if text else {"queue": [], "last": -1}
+            value = update(state)
+            queue_file.seek(0)
+            queue_file.truncate()
+            queue_file.write(json.dumps(state))
+            return value
+
+    @contextlib.contextmanager
+    def slot(self, tool: str):
+        if tool not in self.tools:
+            yield
+            return
+        # threads of one check (CheckScheduler) wait separately
+        me = [os.getpid(), threading.get_ident(), level or 0]
+
+        def take(state: Dict):
+            if me not in state["queue"]:
+                state["queue"].append(me)
+            if self.next_waiter(state) != me:
+                return None
+            slot = self.try_slot(tool)
+            if slot is not None:
+                state["queue"].remove(me)
+                state["last"] = me[2]
+                # another slot may be free for the next one
+                self.wake_next(tool, state)
+            return slot
+
+        def sweep_and_take(state: Dict):
+            self.sweep(tool, state)
+            return take(state)
+
+        def leave(state: Dict):
+            if me in state["queue"]:
+                state["queue"].remove(me)
+            self.wake_next(tool, state)
+
+        def release(state: Dict):
+            self.sweep(tool, state)
+            self.wake_next(tool, state)
+
+        wakeup_path = self.wakeup_path(tool, me)
+        if wakeup_path.exists():
+            # left behind by a dead process with the same pid
+            wakeup_path.unlink()
+        os.mkfifo(wakeup_path, 0o600)
+        # opened for writing too, so the FIFO never reads as closed
+        wakeup = os.open(wakeup_path, os.O_RDWR | os.O_NONBLOCK)
+        try:
+            update = take
+            wait = POOL_MIN_WAIT
+            while (slot := self.update_queue(tool, update)) is None:
+                if select.select([wakeup], [], [], wait)[0]:
+                    os.read(wakeup, 4096)
+                    update = take
+                else:
+                    # nobody woke us, the waiter whose turn it was may be dead
+                    update = sweep_and_take
+                    wait = min(wait * 2, POOL_MAX_WAIT)
+        except BaseException:
+            self.update_queue(tool, leave)
+            raise
+        finally:
+            os.close(wakeup)
+            wakeup_path.unlink()
+        try:
+            with slot:
+                yield
+        finally:
+            self.update_queue(tool, release)
+
+# only enabled by the daemon and batch modes, see `main`
+toolchain_cache = None
+toolchain_pool = None
+
+def run_tool(command: List[str]) -> Tuple[bytes, bytes]:
+    """
+    run_command, answered by the toolchain cache when possible
+    """
+    key = toolchain_cache.key(command) if toolchain_cache else None
+    if key is None:
+        return run_command(command)
+    cached = toolchain_cache.get(key)
+    if cached is not None:
+        return cached
+    stdout, stderr = run_command(command)
+    toolchain_cache.put(key, stdout, stderr)
+    return stdout, stderr
+
 def try_compile(commands) -> Tuple[str, str]:
     try:
-        with tempfile.TemporaryFile() as temp_file, tempfile.TemporaryFile() as temp_file2:
-            process = subprocess.Popen(commands, stdout=temp_file, stderr=temp_file2)
-            process.wait()
-            temp_file.seek(0)
-            temp_file2.seek(0)
-            stdout = temp_file.read()
-            stderr = temp_file2.read()
+        stdout, stderr = run_command(commands)
+    except CheckError:
+        raise
     except:
-         print(f"Can not run {' '.join(commands)}")
-         sys.exit(1)
+        raise CheckError(f"Can not run {' '.join(map(str, commands))}")
     
     return stdout.decode('utf-8').strip(), stderr.decode('utf-8').strip()
 
+# budget of a diff, beyond it the differing middle part is reported as a whole
+DIFF_MAX_EDITS = 2000
+DIFF_TIMEOUT = 2
+DIFF_MAX_LINES = 400
+DIFF_MAX_LINE_LENGTH = 500
+
+def diff_edits(a: List[str], b: List[str], max_edits: int = DIFF_MAX_EDITS, timeout: float = DIFF_TIMEOUT) -> List[Tuple[str, int, int]]:
+    """
+    Myers O(ND) diff of two lists of lines, as (tag, index in a, index in b) with tag in " -+".
+    Lines are interned to integers and the common prefix/suffix is skipped first. If the
+    edit distance exceeds max_edits or the time budget runs out, the middle part is reported
+    as removed and added as a whole.
+    """
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+
+    prefix = 0
+    while prefix < len(a_ids) and prefix < len(b_ids) and a_ids[prefix] == b_ids[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < len(a_ids) - prefix and suffix < len(b_ids) - prefix \
+            and a_ids[-1 - suffix] == b_ids[-1 - suffix]:
+        suffix += 1
+    x_ids = a_ids[prefix:len(a_ids) - suffix]
+    y_ids = b_ids[prefix:len(b_ids) - suffix]
+
+    middle = myers_middle(x_ids, y_ids, max_edits, time.monotonic() + timeout)
+    if middle is None:
+        middle = [("-", i, None) for i in range(len(x_ids))] + [("+", None, j) for j in range(len(y_ids))]
+
+    edits = [(" ", i, i) for i in range(prefix)]
+    for tag, i, j in middle:
+        edits.append((tag, None if i is None else prefix + i, None if j is None else prefix + j))
+    edits += [(" ", len(a) - suffix + i, len(b) - suffix + i) for i in range(suffix)]
+    return edits
+
+def myers_middle(a: List[int], b: List[int], max_edits: int, deadline: float) -> List[Tuple[str, int, int]]:
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in range(max_d + 1):
+        if time.monotonic() > deadline:
+            return None
+        # only the diagonals -d-1 .. d+1 are read when backtracking round d
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return myers_backtrack(trace, n, m)
+    return None
+
+def myers_backtrack(trace: List[List[int]], x: int, y: int) -> List[Tuple[str, int, int]]:
+    edits = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            edits.append((" ", x, y))
+        if d > 0:
+            if x == prev_x:
+                edits.append(("+", None, prev_y))
+            else:
+                edits.append(("-", prev_x, None))
+        x, y = prev_x, prev_y
+    edits.reverse()
+    return edits
+
+def unified_diff(a: List[str], b: List[str], context: int = 3, max_lines: int = DIFF_MAX_LINES,
+                 a_name: str = "submitted", b_name: str = "given"):
+    """
+    Yield the unified diff of two lists of lines, at most max_lines lines of hunks,
+    each cut to DIFF_MAX_LINE_LENGTH characters
+    """
+    edits = diff_edits(a, b)
+    changed = [index for index, (tag, _, _) in enumerate(edits) if tag != " "]
+    if not changed:
+        return
+    yield f"--- {a_name}"
+    yield f"+++ {b_name}"
+
+    # group the changes whose contexts overlap into hunks
+    hunks = []
+    start, end = changed[0], changed[0]
+    for index in changed[1:]:
+        if index - end > 2 * context:
+            hunks.append((start, end))
+            start = index
+        end = index
+    hunks.append((start, end))
+
+    emitted = 0
+    for start, end in hunks:
+        start = max(0, start - context)
+        end = min(len(edits), end + context + 1)
+        hunk = edits[start:end]
+        a_lines = [i for tag, i, _ in hunk if tag != "+"]
+        b_lines = [j for tag, _, j in hunk if tag != "-"]
+        a_start = a_lines[0] + 1 if a_lines else next((i for tag, i, _ in edits[start:] if i is not None), len(a))
+        b_start = b_lines[0] + 1 if b_lines else next((j for tag, _, j in edits[start:] if j is not None), len(b))
+        yield f"@@ -{a_start},{len(a_lines)} +{b_start},{len(b_lines)} @@"
+        for tag, i, j in hunk:
+            if emitted >= max_lines:
+                yield f"... (diff truncated after {max_lines} lines)"
+                return
+            line = a[i] if tag != "+" else b[j]
+            if len(line) > DIFF_MAX_LINE_LENGTH:
+                line = line[:DIFF_MAX_LINE_LENGTH] + " ... (line truncated)"
+            yield tag + line
+            emitted += 1
+
+class ParserPool():
+    """
+    Process-wide pool of tree-sitter parsers, the grammar is loaded (dlopen) only once.
+    A parser can not be shared by threads, so every parse takes one out of the pool
+    and puts it back afterwards; the pool grows to the number of concurrent parses.
+    """
+    def __init__(self, language_path: str, language_name: str):
+        self.language_path = language_path
+        self.language_name = language_name
+        self.language = None
+        self.idle = []
+        self.queries = {}
+        self.lock = threading.Lock()
+
+    def get_language(self) -> tree_sitter.Language:
+        import tree_sitter
+        with self.lock:
+            if self.language is None:
+                self.language = tree_sitter.Language(self.language_path, self.language_name)
+            return self.language
+
+    def query(self, source: str) -> tree_sitter.Query:
+        """
+        The query of source on the grammar, compiled only once
+        """
+        language = self.get_language()
+        with self.lock:
+            if source not in self.queries:
+                self.queries[source] = language.query(source)
+            return self.queries[source]
+
+    @contextlib.contextmanager
+    def parser(self):
+        language = self.get_language()
+        with self.lock:
+            parser = self.idle.pop() if self.idle else None
+        if parser is None:
+            import tree_sitter
+            parser = tree_sitter.Parser()
+            parser.set_language(language)
+        try:
+            yield parser
+        finally:
+            with self.lock:
+                self.idle.append(parser)
+
+c_parsers = ParserPool("/challenge/c-language.so", "c")
+
+class KeywordMatcher():
+    """
+    Aho-Corasick automaton, finds which keywords occur in a text in one pass over the text.
+    Add all keywords before searching: the failure links of the whole trie are built by
+    the first search, and rebuilt by a search following more additions.
+    """
+    def __init__(self):
+        self.keywords = []
+        self.indexes = {}
+        self.goto = [{}]
+        self.fail = [0]
+        # keywords ending at a state, and the nearest state on the failure chain which has some
+        self.output = [[]]
+        self.output_link = [0]
+        self.dirty = False
+
+    def add(self, keyword: str):
+        if not keyword or keyword in self.indexes:
+            return
+        state = 0
+        for char in keyword:
+            if char not in self.goto[state]:
+                self.goto[state][char] = len(self.goto)
+                self.goto.append({})
+                self.output.append([])
+            state = self.goto[state][char]
+        self.indexes[keyword] = len(self.keywords)
+        self.output[state].append(self.indexes[keyword])
+        self.keywords.append(keyword)
+        self.dirty = True
+
+    def build(self):
+        self.fail = [0] * len(self.goto)
+        self.output_link = [0] * len(self.goto)
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                target = self.fail[child]
+                self.output_link[child] = target if self.output[target] else self.output_link[target]
+                queue.append(child)
+        self.dirty = False
+
+    def search(self, text: str) -> List[str]:
+        """
+        Return the keywords occurring in text, in the order they were added
+        """
+        if self.dirty:
+            self.build()
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            match = state if self.output[state] else self.output_link[state]
+            while match:
+                found.update(self.output[match])
+                match = self.output_link[match]
+        return [self.keywords[index] for index in sorted(found)]
+
+CONSTANT_DEFINE_QUERY = "(preproc_def name: (identifier) @name)"
+
 """
 Class PreprocessAnalyzeBase is the base class of challenges related to preprocess.
 """
 class PreprocessAnalyzeBase():
     def __init__(self):
-        C_LANGUAGE = Language("/challenge/c-language.so", "c")
-        self.parser = Parser()
-        self.parser.set_language(C_LANGUAGE)
-
         self.defined_constants = {}
         self.defined_functions = {}
+        self.constant_matcher = KeywordMatcher()
 
         self.defined_constants_uses = {}
         self.defined_functions_uses = {}
@@ -160,95 +952,97 @@ class PreprocessAnalyzeBase():
                 if cursor.goto_next_sibling():
                     break
 
-    def find_constant_define(self, cursor: tree_sitter.TreeCursor):
+    # node type -> handlers to run on it, in order
+    node_handlers = {
+        "preproc_def": ["find_constant_define"],
+        "preproc_function_def": ["find_function_define"],
+        "identifier": ["find_constant_define_use", "find_function_define_use"],
+        "preproc_arg": ["find_constant_define_use"],
+        "type_identifier": ["find_constant_define_use"],
+    }
+
+    def find_constant_define(self, node: tree_sitter.Node, text: str):
         """
         Find #define of integers, floats and strings etc.
         """
-        if cursor.node.type == "preproc_def":
-            defined_name = cursor.node.child_by_field_name("name").text.decode('utf-8').strip()
-            defined_value = cursor.node.child_by_field_name("value").text.decode('utf-8').strip()
-            defined_line_num = cursor.node.start_point[0] + 1   #? line num in tree_sitter is start from 0, so add 1
-
-            self.defined_constants[defined_name] = {
-                "value": defined_value,
-                "line_num": defined_line_num
-            }
-            print(f"Found constant define: {defined_name} = {defined_value} at line {defined_line_num}")
+        defined_name = node.child_by_field_name("name").text.decode('utf-8').strip()
+        defined_value = node.child_by_field_name("value").text.decode('utf-8').strip()
+        defined_line_num = self.get_node_line_num(node)   #? line num in tree_sitter is start from 0, so add 1
+
+        self.defined_constants[defined_name] = {
+            "value": defined_value,
+            "line_num": defined_line_num
+        }
+        print(f"Found constant define: {defined_name} = {defined_value} at line {defined_line_num}")
     
-    def find_constant_define_use(self, cursor: tree_sitter.TreeCursor):
+    def find_constant_define_use(self, node: tree_sitter.Node, identifier_name: str):
         """
         Find the use of defined constants
         """
-        if cursor.node.type == "identifier" or cursor.node.type == "preproc_arg" \
-                or cursor.node.type == "type_identifier":
-            identifier_name = cursor.node.text.decode('utf-8').strip()
-
-            # use defined constant directly
-            if identifier_name in self.defined_constants.keys() \
-                    and self.get_node_line_num(cursor.node) > self.defined_constants[identifier_name]["line_num"]:
-                defined_name = identifier_name
-                if defined_name not in self.defined_constants_uses.keys():
-                    self.defined_constants_uses[defined_name] = []
-                    self.defined_constants_uses[defined_name].append(cursor.node)
-                else:
-                    self.defined_constants_uses[defined_name].append(cursor.node)
-                print(f"Found constant use: {defined_name} at line {cursor.node.start_point[0] + 1}")
-            
-            #?" use defined constant in expression/string
-            #? e.g. #define C A+B
-            else:
-                for defined_name in self.defined_constants.keys():
-                    if defined_name in identifier_name \
-                            and self.get_node_line_num(cursor.node) > self.defined_constants[defined_name]["line_num"]:
-                        if defined_name not in self.defined_constants_uses.keys():
-                            self.defined_constants_uses[defined_name] = []
-                            self.defined_constants_uses[defined_name].append(cursor.node)
-                        else:
-                            self.defined_constants_uses[defined_name].append(cursor.node)
-                        print(f"Found constant use: {defined_name} at line {cursor.node.start_point[0] + 1}")
-
-    def find_function_define(self, cursor: tree_sitter.TreeCursor):
+        line_num = self.get_node_line_num(node)
+
+        # use defined constant directly
+        if identifier_name in self.defined_constants \
+                and line_num > self.defined_constants[identifier_name]["line_num"]:
+            self.defined_constants_uses.setdefault(identifier_name, []).append(node)
+            print(f"Found constant use: {identifier_name} at line {line_num}")
+        
+        #?" use defined constant in expression/string
+        #? e.g. #define C A+B
+        else:
+            # the matcher knows every constant of the code, only those defined so far count
+            for defined_name in self.constant_matcher.search(identifier_name):
+                if defined_name in self.defined_constants \
+                        and line_num > self.defined_constants[defined_name]["line_num"]:
+                    self.defined_constants_uses.setdefault(defined_name, []).append(node)
+                    print(f"Found constant use: {defined_name} at line {line_num}")
+
+    def find_function_define(self, node: tree_sitter.Node, text: str):
         """
         Find #define of functions
         """
         try:
-            if cursor.node.type == "preproc_function_def":
-                defined_func_name = cursor.node.child_by_field_name("name").text.decode('utf-8').strip()
-                defined_func_line_num = cursor.node.start_point[0] + 1
-                defined_func_body = cursor.node.child_by_field_name("value").text.decode('utf-8').strip()
-
-                self.defined_functions[defined_func_name] = {
-                    "body": defined_func_body,
-                    "line_num": defined_func_line_num
-                }
-                print(f"Found function define: {defined_func_name} at line {defined_func_line_num}")
+            defined_func_name = node.child_by_field_name("name").text.decode('utf-8').strip()
+            defined_func_line_num = self.get_node_line_num(node)
+            defined_func_body = node.child_by_field_name("value").text.decode('utf-8').strip()
+
+            self.defined_functions[defined_func_name] = {
+                "body": defined_func_body,
+                "line_num": defined_func_line_num
+            }
+            print(f"Found function define: {defined_func_name} at line {defined_func_line_num}")
         except:
             pass
 
-    def find_function_define_use(self, cursor: tree_sitter.TreeCursor):
+    def find_function_define_use(self, node: tree_sitter.Node, identifier_name: str):
         """
-        Find #define of functions
+        Find the use of function-like macros
         """
-        if cursor.node.type == "identifier":
-            identifier_name = cursor.node.text.decode('utf-8').strip()
-            # use defined constant directly
-            if identifier_name in self.defined_functions.keys() \
-                    and self.get_node_line_num(cursor.node) > self.defined_functions[identifier_name]["line_num"]:
-                defined_name = identifier_name
-                if defined_name not in self.defined_functions_uses.keys():
-                    self.defined_functions_uses[defined_name] = []
-                    self.defined_functions_uses[defined_name].append(cursor.node)
-                else:
-                    self.defined_functions_uses[defined_name].append(cursor.node)
-                print(f"Found function use: {defined_name} at line {cursor.node.start_point[0] + 1}")
-
-    def check_func_macro_implementation(self, macros: List[str], keywords: List[str]) -> bool:
-        for macro, keyword in zip(macros, keywords):
+        line_num = self.get_node_line_num(node)
+        # use defined function directly
+        if identifier_name in self.defined_functions \
+                and line_num > self.defined_functions[identifier_name]["line_num"]:
+            self.defined_functions_uses.setdefault(identifier_name, []).append(node)
+            print(f"Found function use: {identifier_name} at line {line_num}")
+
+    def visit(self, node: tree_sitter.Node):
+        """
+        Run the handlers of the node type, the text of the node is decoded only once
+        """
+        handlers = self.node_handlers.get(node.type)
+        if not handlers:
+            return
+        text = node.text.decode('utf-8').strip()
+        for handler in handlers:
+            getattr(self, handler)(node, text)
+
+    def check_func_macro_implementation(self, macros: List[str], keywords: List[str]) -> CheckResult:
+        # only the first macro is checked, as the checker always did
+        for macro, keyword in list(zip(macros, keywords))[:1]:
             if keyword not in self.defined_functions[macro]["body"]:
-                print(f"Maybe you should use {keyword} in your macro {macro} !")
-                sys.exit(1)
+                return CheckResult(False, f"Maybe you should use {keyword} in your macro {macro} !")
 
-            return True
+        return CheckResult(True)
 
     def get_input_file(self):
         print_split_line()
@@ -258,8 +1052,7 @@ class PreprocessAnalyzeBase():
         self.input_path = input('filename> ')
         self.input_path = pathlib.Path(self.input_path).resolve()
         if not check_file_exists(self.input_path):
-            print("File not found !")
-            sys.exit(1)
+            raise CheckError("File not found !")
         
         submitted_code = try_read_file(self.input_path)
         print("Following is your submitted code: ")
@@ -268,13 +1061,6 @@ class PreprocessAnalyzeBase():
         print_split_line()
         return submitted_code
 
-    def diff_output(self, str1: str, str2: str):
-        differ = difflib.Differ()
-        diff_lines = list(differ.compare(str1.splitlines(), str2.splitlines()))
-        for line in diff_lines:
-            if line.startswith('-') or line.startswith('+'):
-                print(line)
-
     def run(self, given_code: str = None):
 
         if not given_code:
@@ -282,162 +1068,606 @@ class PreprocessAnalyzeBase():
         else:
             source_code = given_code
 
+        # the same instance checks many submissions in batch mode
+        self.defined_constants = {}
+        self.defined_functions = {}
+        self.defined_constants_uses = {}
+        self.defined_functions_uses = {}
+        self.constant_matcher = KeywordMatcher()
+
         try:
-            self.tree = self.parser.parse(source_code.encode('utf-8'))
+            with c_parsers.parser() as parser:
+                self.tree = parser.parse(source_code.encode('utf-8'))
             self.root_node = self.tree.root_node
         except:
-            print("Parse error! Please check your source code.")
-            sys.exit(1)
-        
+            raise CheckError("Parse error! Please check your source code.")
+
+        # the names of every #define go in the matcher before the traversal, so it is built once
+        for name, _ in c_parsers.query(CONSTANT_DEFINE_QUERY).captures(self.root_node):
+            self.constant_matcher.add(name.text.decode('utf-8').strip())
+
         try:
             for cursor in self.traverse_tree("depth_first"):
-                self.find_constant_define(cursor)
-                self.find_constant_define_use(cursor)
-                self.find_function_define(cursor)
-                self.find_function_define_use(cursor)
+                self.visit(cursor.node)
+        except CheckError:
+            raise
         except Exception as e:
-            print(e)
-            print(traceback.format_exec())
-            print("Traverse error! Please check the grammar of your source code.")
-            print("If you are sure that your source code is correct, please contact the TA.")
-            sys.exit(1)
+            raise CheckError("Traverse error! Please check the grammar of your source code.\n"
+                             "If you are sure that your source code is correct, please contact the TA.",
+                             f"{e}\n{traceback.format_exc()}")
 
-    def check_macro_define(self, macros: List[str]) -> bool:
+    def check_macro_define(self, macros: List[str]) -> CheckResult:
         """
         Check if the submitted code has defined the macros we give.
         """
         for macro in macros:
             if macro not in self.defined_constants.keys() and macro not in self.defined_functions.keys():
-                print(f"You should define macro {macro} !")
-                sys.exit(1)
-        return True
+                return CheckResult(False, f"You should define macro {macro} !")
+        return CheckResult(True)
     
-    def check_constant_macro_use_cnt(self, macros: List[str], use_cnt: List[int]) -> bool:
+    def check_constant_macro_use_cnt(self, macros: List[str], use_cnt: List[int]) -> CheckResult:
         """
         check if the submitted code has used the macros we give.
         """
-        try:
-            for macro, cnt in zip(macros, use_cnt):
-                if len(self.defined_constants_uses[macro]) != cnt:
-                    print(f"You should use macro {macro} {cnt} times !")
-                    sys.exit(1)
-        except Exception:
-            print("Remember to use the macros you defined !")
-            sys.exit(1)
-        return True
+        for macro, cnt in zip(macros, use_cnt):
+            if macro not in self.defined_constants_uses:
+                return CheckResult(False, "Remember to use the macros you defined !")
+            if len(self.defined_constants_uses[macro]) != cnt:
+                return CheckResult(False, f"You should use macro {macro} {cnt} times !")
+        return CheckResult(True)
     
-    def check_function_macro_use_cnt(self, macros: List[str], use_cnt: List[int]) -> bool:
+    def check_function_macro_use_cnt(self, macros: List[str], use_cnt: List[int]) -> CheckResult:
         """
         check if the submitted code has used the macros we give.
         """
-        try:
-            for macro, cnt in zip(macros, use_cnt):
-                if len(self.defined_functions_uses[macro]) != cnt:
-                    print(f"You should use macro {macro} {cnt} times !")
-                    sys.exit(1)
-        except Exception:
-            print("Remember to use the macros you defined !")
-            sys.exit(1)
-        return True
-
-    def check_directive(self, directive, direct_cnt) -> bool:
+        for macro, cnt in zip(macros, use_cnt):
+            if macro not in self.defined_functions_uses:
+                return CheckResult(False, "Remember to use the macros you defined !")
+            if len(self.defined_functions_uses[macro]) != cnt:
+                return CheckResult(False, f"You should use macro {macro} {cnt} times !")
+        return CheckResult(True)
+
+    def check_directive(self, directive, direct_cnt) -> CheckResult:
         """
         check if the submitted code has directives we want.
         """
         preprocessed_given = try_read_file(self.input_path).strip()
         if preprocessed_given.count(directive) != direct_cnt:
-            print(f"You should use directive {directive} {direct_cnt} times !")
-            return False
-        return True
+            return CheckResult(False, f"You should use directive {directive} {direct_cnt} times !")
+        return CheckResult(True)
     
-    def check_line_num(self, line_num: int = None, max_line_num: int = None, min_line_num: int = None):
+    def check_line_num(self, line_num: int = None, max_line_num: int = None, min_line_num: int = None) -> CheckResult:
         preprocessed_given = try_read_file(self.input_path).strip()
         preprocessed_lines = preprocessed_given.split('\n')
         if line_num:
             if len(preprocessed_lines) != line_num:
-                print(f"You should have {line_num} lines of preprocessed code !")
-                return False
+                return CheckResult(False, f"You should have {line_num} lines of preprocessed code !")
         if max_line_num:
             if len(preprocessed_lines) > max_line_num:
-                print(f"You should have less than {max_line_num} lines of preprocessed code !")
-                return False
+                return CheckResult(False, f"You should have less than {max_line_num} lines of preprocessed code !")
         if min_line_num:
             if len(preprocessed_lines) < min_line_num:
-                print(f"You should have more than {min_line_num} lines of preprocessed code !")
-                return False
-        return True
+                return CheckResult(False, f"You should have more than {min_line_num} lines of preprocessed code !")
+        return CheckResult(True)
 
-    def check_preprocess(self, defined_macros: List[Dict] = None , check_target:str = None, remove_empty_line = None) -> bool:
+    def preprocess(self, defined_macros: List[Dict] = None) -> Tuple[bytes, bytes]:
         """
-        Check if the preprocessed submitted code is same as the give preprocessed code.
+        Run `clang-15 -E -P` on the submitted code with the given macros defined
         """
-        try:
-            if not defined_macros:
-                with tempfile.TemporaryFile() as temp_file, tempfile.TemporaryFile() as temp_file2:
-                    process = subprocess.Popen(["clang-15", "-E", "-P", "-x", "c", self.input_path], stdout=temp_file, stderr=temp_file2)
-                    process.wait()
-                    temp_file.seek(0)
-                    temp_file2.seek(0)
-                    stdout = temp_file.read()
-                    stderr = temp_file2.read()
+        command = ["clang-15", "-E", "-P", "-x", "c"]
+        for macro in defined_macros or []:
+            if macro["value"]:
+                command.append(f"-D{macro['name']}={macro['value']}")
             else:
-                command = ["clang-15", "-E", "-P", "-x", "c"]
-                for macro in defined_macros:
-                    if macro["value"]:
-                        command.append(f"-D{macro['name']}={macro['value']}")
-                    else:
-                        command.append(f"-D{macro['name']}")
-                command.append(self.input_path)
-                with tempfile.TemporaryFile() as temp_file, tempfile.TemporaryFile() as temp_file2:
-                    process = subprocess.Popen(command, stdout=temp_file, stderr=temp_file2)
-                    process.wait()
-                    temp_file.seek(0)
-                    temp_file2.seek(0)
-                    stdout = temp_file.read()
-                    stderr = temp_file2.read()
+                command.append(f"-D{macro['name']}")
+        command.append(self.input_path)
+        try:
+            return run_tool(command)
+        except CheckError:
+            raise
         except:
-            print("Can not run clang-15 -E -P on your submitted code !")
-            sys.exit(1)
-        
+            raise CheckError("Can not run clang-15 -E -P on your submitted code !")
+
+    def check_preprocess(self, defined_macros: List[Dict] = None , check_target:str = None, remove_empty_line = None) -> CheckResult:
+        """
+        Check if the preprocessed submitted code is same as the give preprocessed code.
+        """
+        stdout, stderr = self.preprocess(defined_macros)
+        return self.compare_preprocessed(stdout, stderr, check_target, remove_empty_line)
+
+    def check_preprocess_variants(self, variants: List[Tuple[List[Dict], str]], remove_empty_line = None) -> CheckResult:
+        """
+        check_preprocess for several (defined_macros, check_target), the variants are
+        checked concurrently and every failure is reported, labelled with the macros and
+        the given file of its variant. Variants failing the same way (the same compiler
+        error) are reported once.
+        """
+        labels = [
+            " ".join(f"-D{macro['name']}={macro['value']}" if macro["value"] else f"-D{macro['name']}"
+                     for macro in defined_macros) + f" ({pathlib.Path(check_target).name})"
+            for defined_macros, check_target in variants
+        ]
+
+        def merge(results: List[CheckResult]) -> CheckResult:
+            failures = {}
+            for label, result in zip(labels, results):
+                if not result:
+                    failures.setdefault((result.reason, result.diagnostic), []).append(label)
+            return CheckResult.all([
+                CheckResult(False, f"{', '.join(failed)}: {reason}",
+                            f"{', '.join(failed)}:\n{diagnostic}" if diagnostic else "")
+                for (reason, diagnostic), failed in failures.items()
+            ])
+
+        return CheckScheduler().run([
+            lambda defined_macros=defined_macros, check_target=check_target:
+                self.check_preprocess(defined_macros, check_target, remove_empty_line)
+            for defined_macros, check_target in variants
+        ], merge)
+
+    def compare_preprocessed(self, stdout: bytes, stderr: bytes, check_target: str = None, remove_empty_line = None) -> CheckResult:
         if stderr:
-            print(stderr.decode('utf-8').strip())
-            print("Your submitted code has some errors, can not be compiled !")
-            sys.exit(1)
+            return CheckResult(False, "Your submitted code has some errors, can not be compiled !",
+                               stderr.decode('utf-8').strip())
         
         preprocessed_submitted = stdout.decode('utf-8').strip()
 
         if not check_target:
-            preprocessed_given = try_read_file(self.given_code).strip()
-        else:
-            preprocessed_given = try_read_file(check_target).strip()
+            check_target = self.given_code
+        preprocessed_given = try_read_file(check_target).strip()
 
         if remove_empty_line:
             preprocessed_given = strip_empty_line(preprocessed_given)
             preprocessed_submitted = strip_empty_line(preprocessed_submitted)
 
         if preprocessed_submitted == preprocessed_given:
-            return True
+            return CheckResult(True)
         else:
-            print("Your submitted code after preprocess: ")
-            print_split_line()
-            print(preprocessed_submitted)
-            print_split_line()
-            print("The given code after preprocess: ")
-            print_split_line()
-            print(preprocessed_given)
-            print_split_line()
-            print("Your submitted code is not same as the given code !")
-            sys.exit(1)
+            return CheckResult(False, "Your submitted code is not same as the given code !", "\n".join([
+                "Following is the diff of your submitted code and the given code after preprocess:",
+                split_line,
+                *unified_diff(preprocessed_submitted.splitlines(), preprocessed_given.splitlines(),
+                              b_name=pathlib.Path(check_target).name),
+                split_line
+            ]))
+
+
+class ASTNode():
+    """
+    A node of `clang -ast-dump` output, only with the attributes which do not depend on
+    addresses or source locations
+    """
+    __slots__ = ("label", "children")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.children = []
+
+    def lines(self, depth: int = 0):
+        yield "  " * depth + self.label
+        for child in self.children:
+            yield from child.lines(depth + 1)
+
+    def units(self) -> Dict[str, List[str]]:
+        """
+        The lines of every top-level declaration of a dump, by label
+        """
+        nodes = self.children
+        if len(nodes) == 1 and nodes[0].label.startswith("TranslationUnitDecl"):
+            nodes = nodes[0].children
+        units = {}
+        for node in nodes:
+            name = node.label
+            while name in units:
+                name += "'"
+            units[name] = list(node.lines())
+        return units
+
+    def histogram(self) -> collections.Counter:
+        """
+        Number of nodes of every kind
+        """
+        kinds = collections.Counter()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.label:
+                kinds[node.label.split(" ", 1)[0]] += 1
+            stack.extend(node.children)
+        return kinds
+
+# tree drawing prefix of a dumped node, e.g. "| |-" or "|   `-"
+AST_PREFIX = re.compile(r"(?:[| ] )*[|`]-")
+# quoted types and strings, source ranges (`<col:1, line:3:5>`, `<<invalid sloc>>`, `<NoOp>`) and plain tokens
+AST_TOKEN = re.compile(r"'[^']*'|\"(?:\\.|[^\"\\])*\"|<(?:[^<>]|<[^<>]*>)*>|\S+")
+AST_LOCATION = re.compile(r"(?:line|col):|\S+:\d+:\d+$")
+# implicit attributes of builtins, their numbers change between clang builds
+AST_IGNORED_NODES = ["BuiltinAttr", "AllocSizeAttr"]
+
+def parse_ast_dump(dump: str) -> ASTNode:
+    """
+    Build the node tree of `clang -ast-dump` output
+    """
+    root = ASTNode("")
+    stack = [root]
+    for line in dump.splitlines():
+        prefix = AST_PREFIX.match(line)
+        depth = len(prefix.group()) // 2 if prefix else 0
+        tokens = AST_TOKEN.findall(line[prefix.end() if prefix else 0:])
+        if not tokens or tokens[0] in AST_IGNORED_NODES:
+            continue
+        # the first token is the kind of the node (`<<<NULL>>>` for an empty child)
+        label = " ".join(tokens[:1] + [token for token in tokens[1:]
+                                       if not token.startswith("0x") and not token.startswith("<")
+                                       and not AST_LOCATION.match(token)])
+
+        # a node without parent at depth - 1 (truncated dump) is attached to the deepest one
+        del stack[depth + 1:]
+        node = ASTNode(label)
+        stack[-1].children.append(node)
+        stack.append(node)
+    return root
+
+def compare_ast(submitted: ASTNode, given: ASTNode, path: List[str] = None) -> str:
+    """
+    Compare two node trees, stop at the first differing subtree.
+    Return None if they are the same, or the description of the mismatch with its path.
+    """
+    path = path or []
+    if submitted.label != given.label:
+        return "\n".join([
+            "The AST differs at: " + " > ".join(path + [given.label]),
+            f"Your node: {submitted.label}",
+            f"Expected node: {given.label}",
+        ])
+    here = path + [given.label] if given.label else path
+    for index, (submitted_child, given_child) in enumerate(zip(submitted.children, given.children)):
+        mismatch = compare_ast(submitted_child, given_child, here)
+        if mismatch:
+            return mismatch
+    if len(submitted.children) != len(given.children):
+        extra = submitted.children[len(given.children):]
+        missing = given.children[len(submitted.children):]
+        return "\n".join(["The AST differs under: " + (" > ".join(here) or "the translation unit")] +
+                         [f"Unexpected node: {child.label}" for child in extra[:3]] +
+                         [f"Missing node: {child.label}" for child in missing[:3]])
+    return None
+
+class IRFunction():
+    """
+    A function of an LLVM IR module: the signature and the basic blocks (label, instructions)
+    """
+    __slots__ = ("name", "header", "blocks")
+
+    def __init__(self, name: str, header: str):
+        self.name = name
+        self.header = header
+        self.blocks = [[None, []]]
+
+    def lines(self):
+        yield self.header + " {"
+        for label, instructions in self.blocks:
+            if label is not None:
+                yield f"{label}:"
+            for instruction in instructions:
+                yield "  " + instruction
+        yield "}"
+
+class IRModule():
+    """
+    An LLVM IR module without comments, metadata, attribute groups and target information.
+    Numbered values (`%3`, `@0`, `#1`, `!6`) are renumbered in the order of first appearance,
+    per function for `%`, per module for the others, named values are kept.
+    """
+    def __init__(self):
+        self.globals = []
+        self.functions = {}
+
+    def lines(self):
+        yield from self.globals
+        for function in self.functions.values():
+            yield from function.lines()
+
+    def units(self) -> Dict[str, List[str]]:
+        units = {"(globals)": self.globals}
+        for name, function in self.functions.items():
+            units[f"@{name}"] = list(function.lines())
+        return units
+
+    def histogram(self) -> collections.Counter:
+        """
+        Number of instructions of every opcode
+        """
+        opcodes = collections.Counter()
+        for function in self.functions.values():
+            for _, instructions in function.blocks:
+                for instruction in instructions:
+                    words = instruction.split(" = ", 1)[-1].split()
+                    if words[0] in ("tail", "musttail", "notail") and len(words) > 1:
+                        words = words[1:]
+                    opcodes[words[0]] += 1
+        return opcodes
+
+IR_SKIPPED_LINES = ("target datalayout", "target triple", "source_filename", "attributes", "!")
+# strings are kept as they are, comments are dropped, numbered values are renumbered
+IR_COMMENT = re.compile(r'c?"[^"]*"|;.*$')
+IR_TOKEN = re.compile(r'c?"[^"]*"|([%@#!])(\d+)\b')
+IR_FUNCTION_NAME = re.compile(r'@([-\w.$]+|"[^"]*")\(')
+IR_LABEL = re.compile(r'([-\w.$]+|"[^"]*"):$')
+
+def parse_llvm_ir(code: str) -> IRModule:
+    """
+    Read the functions, basic blocks and instructions of textual LLVM IR
+    """
+    module = IRModule()
+    numbering = {"%": {}, "@": {}, "#": {}, "!": {}}
+
+    def uncomment(match: re.Match) -> str:
+        return "" if match.group().startswith(";") else match.group()
+
+    def canonical(match: re.Match) -> str:
+        if match.group(1) is None:
+            return match.group()
+        values = numbering[match.group(1)]
+        return match.group(1) + str(values.setdefault(match.group(2), len(values)))
+
+    function = None
+    for line in code.splitlines():
+        stripped = IR_COMMENT.sub(uncomment, line).strip() if ";" in line else line.strip()
+        if not stripped or (function is None and stripped.startswith(IR_SKIPPED_LINES)):
+            continue
+
+        if function is None:
+            if not stripped.startswith("define "):
+                module.globals.append(IR_TOKEN.sub(canonical, stripped))
+                continue
+            numbering["%"] = {}
+            header = IR_TOKEN.sub(canonical, stripped)
+            name = IR_FUNCTION_NAME.search(header)
+            function = IRFunction(name.group(1) if name else header, header.rstrip("{").rstrip())
+            continue
+
+        if stripped == "}":
+            module.functions[function.name] = function
+            function = None
+            continue
+
+        label = IR_LABEL.match(stripped)
+        if label:
+            name = label.group(1)
+            if name.isdigit():
+                name = IR_TOKEN.sub(canonical, f"%{name}")[1:]
+            function.blocks.append([name, []])
+        else:
+            function.blocks[-1][1].append(IR_TOKEN.sub(canonical, stripped))
+    return module
+
+def compare_ir(submitted: IRModule, given: IRModule) -> str:
+    """
+    Compare two modules function by function, stop at the first difference.
+    Return None if they are the same, or the description of the difference.
+    """
+    def differ(where: str, yours: str, expected: str) -> str:
+        return "\n".join([f"The LLVM IR differs at {where}", f"Your line: {yours}", f"Expected line: {expected}"])
+
+    for index in range(max(len(submitted.globals), len(given.globals))):
+        yours = submitted.globals[index] if index < len(submitted.globals) else "(nothing)"
+        expected = given.globals[index] if index < len(given.globals) else "(nothing)"
+        if yours != expected:
+            return differ("the global definitions", yours, expected)
+
+    if list(submitted.functions) != list(given.functions):
+        return "\n".join(["The LLVM IR defines different functions",
+                          "Your functions: " + ", ".join(f"@{name}" for name in submitted.functions),
+                          "Expected functions: " + ", ".join(f"@{name}" for name in given.functions)])
+
+    for name, expected_function in given.functions.items():
+        function = submitted.functions[name]
+        if function.header != expected_function.header:
+            return differ(f"function @{name}", function.header, expected_function.header)
+        for index in range(max(len(function.blocks), len(expected_function.blocks))):
+            if index >= len(function.blocks) or index >= len(expected_function.blocks):
+                return f"The LLVM IR differs at function @{name}: {len(function.blocks)} basic blocks, expected {len(expected_function.blocks)}"
+            label, instructions = function.blocks[index]
+            expected_label, expected_instructions = expected_function.blocks[index]
+            where = f"function @{name}, basic block {index}"
+            if label != expected_label:
+                return differ(where, f"{label}:", f"{expected_label}:")
+            for position in range(max(len(instructions), len(expected_instructions))):
+                yours = instructions[position] if position < len(instructions) else "(nothing)"
+                expected = expected_instructions[position] if position < len(expected_instructions) else "(nothing)"
+                if yours != expected:
+                    return differ(where, yours, expected)
+    return None
+
+class AsmModule():
+    """
+    Assembly without comments, `.file`/`.ident` and blank lines, with whitespace collapsed.
+    The lines are kept by section, sections are listed in name order so their order in
+    the file does not matter. The lines of every function are kept by name too.
+    """
+    def __init__(self):
+        self.options = []
+        self.sections = {}
+        self.functions = {}
+
+    def lines(self):
+        yield from self.options
+        for name in sorted(self.sections):
+            yield f".section {name}"
+            yield from self.sections[name]
+
+    def units(self) -> Dict[str, List[str]]:
+        return self.functions
+
+    def histogram(self) -> collections.Counter:
+        """
+        Number of instructions of every mnemonic
+        """
+        mnemonics = collections.Counter()
+        for lines in self.sections.values():
+            for line in lines:
+                if not line.startswith(".") and not line.endswith(":"):
+                    mnemonics[line.split(" ", 1)[0]] += 1
+        return mnemonics
+
+ASM_SKIPPED_DIRECTIVES = (".file", ".ident")
+# not bound to a section
+ASM_OPTION_DIRECTIVES = (".intel_syntax", ".att_syntax")
+# llc may emit them before switching to the section of the symbol
+ASM_SYMBOL_DIRECTIVES = (".globl", ".weak", ".local", ".hidden", ".protected", ".type")
+# strings are kept as they are, comments are dropped, whitespace is collapsed
+ASM_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|#.*$|\s+')
+ASM_FUNCTION_TYPE = re.compile(r'\.type ([^,\s]+) ?, ?@function')
+ASM_LABEL = re.compile(r'([^\s:"]+|"[^"]*"):$')
+
+def parse_asm(code: str) -> AsmModule:
+    """
+    Read the sections and functions of assembly (as written by llc)
+    """
+    module = AsmModule()
+
+    def canonical(match: re.Match) -> str:
+        token = match.group()
+        if token.startswith('"'):
+            return token
+        return "" if token.startswith("#") else " "
+
+    section = ".text"
+    symbol_directives = []
+    function_names = set()
+    function = None
+    for line in code.splitlines():
+        stripped = ASM_TOKEN.sub(canonical, line).strip()
+        if not stripped:
+            continue
+        directive, _, operands = stripped.partition(" ")
+        if directive in ASM_SKIPPED_DIRECTIVES:
+            continue
+        if directive in ASM_OPTION_DIRECTIVES:
+            module.options.append(stripped)
+            continue
+        if directive in (".text", ".data", ".bss", ".section"):
+            # an empty section (e.g. .note.GNU-stack) matters too
+            section = operands if directive == ".section" else directive
+            module.sections.setdefault(section, [])
+            continue
+        if directive in ASM_SYMBOL_DIRECTIVES:
+            function_type = ASM_FUNCTION_TYPE.match(stripped)
+            if function_type:
+                function_names.add(function_type.group(1))
+            symbol_directives.append(stripped)
+            continue
 
+        label = ASM_LABEL.match(stripped)
+        if function is None and label and label.group(1) in function_names:
+            function = label.group(1)
+            module.functions[function] = []
+
+        lines = symbol_directives + [stripped]
+        symbol_directives = []
+        module.sections.setdefault(section, []).extend(lines)
+        if function is not None:
+            module.functions[function].extend(lines)
+            if directive == ".size" and operands.split(",")[0].strip() == function:
+                function = None
+    if symbol_directives:
+        module.sections.setdefault(section, []).extend(symbol_directives)
+    return module
+
+def compare_asm(submitted: AsmModule, given: AsmModule) -> str:
+    """
+    Compare two assemblies function by function, then section by section, stop at the
+    first difference. Return None if they are the same, or the description of the difference.
+    """
+    def first_difference(where: str, lines: List[str], expected_lines: List[str]) -> str:
+        for index in range(max(len(lines), len(expected_lines))):
+            yours = lines[index] if index < len(lines) else "(nothing)"
+            expected = expected_lines[index] if index < len(expected_lines) else "(nothing)"
+            if yours != expected:
+                return "\n".join([f"The assembly differs at {where}, line {index + 1}",
+                                  f"Your line: {yours}", f"Expected line: {expected}"])
+        return None
+
+    if list(submitted.functions) != list(given.functions):
+        return "\n".join(["The assembly defines different functions",
+                          "Your functions: " + ", ".join(submitted.functions),
+                          "Expected functions: " + ", ".join(given.functions)])
+    for name, expected_lines in given.functions.items():
+        mismatch = first_difference(f"function {name}", submitted.functions[name], expected_lines)
+        if mismatch:
+            return mismatch
+
+    if sorted(submitted.sections) != sorted(given.sections):
+        return "\n".join(["The assembly has different sections",
+                          "Your sections: " + ", ".join(sorted(submitted.sections)),
+                          "Expected sections: " + ", ".join(sorted(given.sections))])
+    for name in sorted(given.sections):
+        mismatch = first_difference(f"section {name}", submitted.sections[name], given.sections[name])
+        if mismatch:
+            return mismatch
+    return None
+
+# a submission further than this from the golden output gets a summary instead of a detailed comparison
+FINGERPRINT_MAX_LINE_RATIO = 0.5
+FINGERPRINT_MAX_HISTOGRAM_DISTANCE = 0.5
+
+def far_from(submitted: Dict, golden: Dict) -> str:
+    """
+    Compare two fingerprints (line count, hash of every unit, histogram of opcodes or node kinds).
+    Return None for a near miss, worth a detailed comparison, or a short summary of the differences.
+    """
+    line_ratio = abs(submitted["lines"] - golden["lines"]) / max(golden["lines"], 1)
+    counts = {key: submitted["histogram"].get(key, 0) - golden["histogram"].get(key, 0)
+              for key in set(submitted["histogram"]) | set(golden["histogram"])}
+    distance = sum(map(abs, counts.values())) / max(sum(golden["histogram"].values()), 1)
+    if line_ratio <= FINGERPRINT_MAX_LINE_RATIO and distance <= FINGERPRINT_MAX_HISTOGRAM_DISTANCE:
+        return None
+
+    summary = ["Your output is far from the expected one, no detailed comparison is shown.",
+               f"Lines: {submitted['lines']}, expected {golden['lines']}"]
+    for title, names in [
+        ("Different", [name for name in golden["units"] if name in submitted["units"] and submitted["units"][name] != golden["units"][name]]),
+        ("Missing", [name for name in golden["units"] if name not in submitted["units"]]),
+        ("Unexpected", [name for name in submitted["units"] if name not in golden["units"]]),
+    ]:
+        if names:
+            summary.append(f"{title}: " + ", ".join(names[:5]) + (", ..." if len(names) > 5 else ""))
+    differences = sorted((key for key in counts if counts[key]), key=lambda key: (-abs(counts[key]), key))
+    summary.append("Most different counts: " + ", ".join(f"{key} {counts[key]:+d}" for key in differences[:5]))
+    return "\n".join(summary)
 
 """
     Compile Base Class
 """
+# bump when `CompileBase.normalize` changes, outdated golden files are then ignored
+GOLDEN_VERSION = 4
+# bump when the layout of the pass tables changes
+PASS_TABLE_VERSION = 1
+
+# the LLVM passes a student may name in the opt levels
+ALLOWED_PASSES = [
+    "-adce", "-always-inline", "-argpromotion", "-attributor", "-barrier", "-basiccg", "-bdce",
+    "-block-freq", "-bounds-checking", "-break-crit-edges", "-bugpoint", "-called-value-propagation",
+    "-mem2reg", "-reg2mem", "-sccp", "-ipsccp", "-constmerge", "-consthoist",
+    "-loop-simplify", "-loop-simplifycfg", "-loop-rotate", "-loop-unroll", "-loop-unswitch", "-licm"
+]
+
 class CompileBase():
+    # the processed given code is compared after normalization, see `check_normalized`
+    has_golden = True
+    # the only input is a pass name, the opt-15 output of every allowed pass is precomputed
+    has_pass_table = False
+    # the golden file is built from the output of this tool, it is rebuilt when the tool changes
+    golden_tool = None
+
     def __init__(self, given_original_path, given_processed_path):
         self.submitted_file_path = None
         self.given_original_code = try_read_file(given_original_path)
         self.given_processed_code = try_read_file(given_processed_path)
+        self.golden = None
+        self.given_parsed = None
+        self.pass_table = None
 
     def get_submitted_file(self):
         print_split_line()
@@ -447,8 +1677,7 @@ class CompileBase():
         submitted_file = input('filename> ')
         self.submitted_file_path = pathlib.Path(submitted_file).resolve()
         if not check_file_exists(self.submitted_file_path):
-            print("File not found !")
-            sys.exit(1)
+            raise CheckError("File not found !")
         
         submitted_code = try_read_file(self.submitted_file_path)
 
@@ -460,107 +1689,477 @@ class CompileBase():
 
     def try_process(self, command: List[str]):
         try:
-            with tempfile.TemporaryFile() as temp_file, tempfile.TemporaryFile() as temp_file2:
-                process = subprocess.Popen(command, stdout=temp_file, stderr=temp_file2)
-                process.wait()
-                temp_file.seek(0)
-                temp_file2.seek(0)
-                stdout = temp_file.read()
-                stderr = temp_file2.read()
+            stdout, stderr = run_tool(command)
+        except CheckError:
+            raise
         except Exception as e:
-            print(e)
-            print(f"Error when running command: {' '.join(command)} !")
-            sys.exit(1)
+            raise CheckError(f"Error when running command: {' '.join(map(str, command))} !", str(e))
         
         if stderr:
-            print(stderr.decode('utf-8').strip())
-            print("Your submitted code has some errors!")
-            sys.exit(1)
+            raise CheckError("Your submitted code has some errors!", stderr.decode('utf-8').strip())
 
         processed_submitted_code = stdout.decode('utf-8')
         return processed_submitted_code
 
-    def diff_output(self, str1: str, str2: str):
-        differ = difflib.Differ()
-        diff_lines = list(differ.compare(str1.splitlines(), str2.splitlines()))
-        for line in diff_lines:
-            if line.startswith('-') or line.startswith('+'):
-                print(line)
+    def diff_output(self, str1: str, str2: str) -> str:
+        return "\n".join(unified_diff(str1.splitlines(), str2.splitlines()))
 
-    def diff_error(self, str1: str, str2: str):
-        print("Your submitted code is not correct !")
-        print("Following is the diff of (processed) submitted code and (processed) given code:")
-        print_split_line()
-        self.diff_output(str1, str2)
+    def diff_error(self, str1: str, str2: str) -> CheckResult:
+        return CheckResult(False, "Your submitted code is not correct !", "\n".join([
+            "Following is the diff of (processed) submitted code and (processed) given code:",
+            split_line,
+            self.diff_output(str1, str2)
+        ]))
+
+    def check_processed(self, submitted: str, given: str) -> CheckResult:
+        if submitted == given:
+            return CheckResult(True)
+        return self.diff_error(submitted, given)
 
     def pass_sanitizer(self, passname: str):
-        allowed_passes = [
-            "-adce", "-always-inline", "-argpromotion", "-attributor", "-barrier", "-basiccg", "-bdce",
-            "-block-freq", "-bounds-checking", "-break-crit-edges", "-bugpoint", "-called-value-propagation",
-            "-mem2reg", "-reg2mem", "-sccp", "-ipsccp", "-constmerge", "-consthoist",
-            "-loop-simplify", "-loop-simplifycfg", "-loop-rotate", "-loop-unroll", "-loop-unswitch", "-licm"
-        ]
         passname = passname.strip()
         if not passname.startswith("-"):
-            print("You should add a '-' before the pass name !")
-            sys.exit(1)
+            raise CheckError("You should add a '-' before the pass name !")
         if len(passname.split()) > 1:
-            print("You should only input one pass name !")
-            sys.exit(1)
-        if passname not in allowed_passes:
-            print("This pass is not allowed !")
-            sys.exit(1)
+            raise CheckError("You should only input one pass name !")
+        if passname not in ALLOWED_PASSES:
+            raise CheckError("This pass is not allowed !")
         return passname
 
-    def trim_ast(self, code: str):
+    def normalize(self, code: str) -> str:
         """
-        remove useless data
+        Normalize the processed code (AST dump, LLVM IR or assembly) before comparing
         """
-        new_lines = []
-        lines = code.split('\n')
-        for line in lines:
-            if "-BuiltinAttr" in line or "-AllocSizeAttr" in line:
-                continue
-            tokens = line.split(' ')
-            new_tokens = []
-            for token in tokens:
-                if token.startswith("0x") or \
-                    "line:" in token or \
-                    "col:" in token or \
-                    "<" in token:
-                    continue
-                new_tokens.append(token)
-            new_lines.append(' '.join(new_tokens))
-        
-        return '\n'.join(new_lines)
+        return self.model_text(self.parse(code))
+
+    def model_text(self, model) -> str:
+        if self.is_ast():
+            return "\n".join(line for node in model.children for line in node.lines())
+        return "\n".join(model.lines())
+
+    def fingerprint(self, model, text: str) -> Dict:
+        return {
+            "lines": text.count("\n") + 1,
+            "units": {name: hashlib.sha256("\n".join(lines).encode()).hexdigest()[:16]
+                      for name, lines in model.units().items()},
+            "histogram": dict(model.histogram()),
+        }
+
+    def parse(self, code: str):
+        """
+        The model of processed code: AST node tree or IR module
+        """
+        if self.is_ast():
+            return parse_ast_dump(code)
+        return parse_llvm_ir(code)
+
+    def compare(self, submitted, given) -> str:
+        if self.is_ast():
+            return compare_ast(submitted, given)
+        return compare_ir(submitted, given)
+
+    def is_ast(self) -> bool:
+        return pathlib.Path(self.given_processed_path).suffix == ".ast"
+
+    def golden_path(self) -> pathlib.Path:
+        return pathlib.Path(f"{self.given_processed_path}.golden")
 
-    def trim_llvmir(self, code: str):
+    def golden_source(self) -> str:
         """
-        remove useless data
+        The code the golden file is normalized from
         """
-        new_lines = []
-        lines = code.split('\n')
-        for line in lines:
-            if line.startswith(";"):    # comment
-                continue
-            elif line.startswith("target datalayout") or line.startswith("target triple"):
-                continue
-            elif line.startswith("!"): # metadata
-                continue
-            elif line.startswith("source_filename"):
-                continue
-            elif line.startswith("attributes"):
-                continue
-            elif line == "":
-                continue
-            new_lines.append(line)
+        return self.given_processed_code
+
+    def golden_tool_fingerprint(self) -> str:
+        return tool_fingerprint(self.golden_tool) if self.golden_tool else None
+
+    def build_golden(self) -> Dict:
+        model = self.parse(self.golden_source())
+        text = self.model_text(model)
+        golden = {
+            "version": GOLDEN_VERSION,
+            "source_sha256": hashlib.sha256(self.given_processed_code.encode()).hexdigest(),
+            "sha256": hashlib.sha256(text.encode()).hexdigest(),
+            "fingerprint": self.fingerprint(model, text),
+            "text": text,
+        }
+        if self.golden_tool:
+            golden["tool"] = self.golden_tool_fingerprint()
+        return golden
+
+    def load_golden(self) -> Dict:
+        """
+        The normalized given code, read from the golden file if it was built from the
+        current given file, normalized here otherwise
+        """
+        if self.golden is None:
+            try:
+                golden = json.loads(try_read_file(self.golden_path()))
+            except (CheckError, ValueError):
+                golden = {}
+            if golden.get("version") != GOLDEN_VERSION or \
+                    golden.get("source_sha256") != hashlib.sha256(self.given_processed_code.encode()).hexdigest() or \
+                    golden.get("tool") != self.golden_tool_fingerprint():
+                golden = self.build_golden()
+            self.golden = golden
+        return self.golden
+
+    def check_normalized(self) -> CheckResult:
+        """
+        Compare the normalized submitted code with the golden one, by hash first, then by
+        fingerprint, only a near miss is compared in detail
+        """
+        submitted_model = self.parse(self.submitted_processed_code)
+        submitted = self.model_text(submitted_model)
+        golden = self.load_golden()
+        if hashlib.sha256(submitted.encode()).hexdigest() == golden["sha256"]:
+            return CheckResult(True)
+        summary = far_from(self.fingerprint(submitted_model, submitted), golden["fingerprint"])
+        if summary:
+            return CheckResult(False, "Your submitted code is not correct !", summary)
+        mismatch = self.compare(submitted_model, self.given_model())
+        if mismatch:
+            return CheckResult(False, "Your submitted code is not correct !", mismatch)
+        return self.check_processed(submitted, golden["text"])
+
+    def given_model(self):
+        """
+        The parsed given code, built on the first mismatch
+        """
+        if self.given_parsed is None:
+            self.given_parsed = self.parse(self.given_processed_code)
+        return self.given_parsed
+
+    def pass_command(self, pass_name: str) -> List[str]:
+        return ["opt-15", "-S", f"-{pass_name}", "-o", "-", self.given_original_path]
+
+    def pass_table_path(self) -> pathlib.Path:
+        return pathlib.Path(f"{self.given_original_path}.passes")
+
+    def build_pass_table(self) -> Dict:
+        """
+        Run opt-15 with every allowed pass on the given IR, None if opt-15 is not installed
+        """
+        fingerprint = tool_fingerprint("opt-15")
+        if fingerprint is None:
+            return None
+
+        def run_pass(pass_name: str) -> Dict:
+            stdout, stderr = run_command(self.pass_command(pass_name))
+            return {"stdout": stdout.decode('utf-8'), "stderr": stderr.decode('utf-8').strip()}
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            outputs = list(executor.map(run_pass, ALLOWED_PASSES))
+        return {
+            "version": PASS_TABLE_VERSION,
+            "tool": fingerprint,
+            "source_sha256": hashlib.sha256(self.given_original_code.encode()).hexdigest(),
+            "passes": dict(zip(ALLOWED_PASSES, outputs)),
+        }
+
+    def load_pass_table(self) -> Dict:
+        """
+        The precomputed outputs by pass name, empty if the table is missing or was built
+        from another given file or another opt-15
+        """
+        if self.pass_table is None:
+            try:
+                table = json.loads(try_read_file(self.pass_table_path()))
+            except (CheckError, ValueError):
+                table = {}
+            if table.get("version") != PASS_TABLE_VERSION or \
+                    table.get("source_sha256") != hashlib.sha256(self.given_original_code.encode()).hexdigest() or \
+                    table.get("tool") != tool_fingerprint("opt-15"):
+                table = {}
+            self.pass_table = table.get("passes", {})
+        return self.pass_table
+
+    def run_pass(self, pass_name: str) -> str:
+        """
+        The opt-15 output of a sanitized pass name, from the pass table when it is up to date
+        """
+        entry = self.load_pass_table().get(pass_name)
+        if entry is None:
+            return self.try_process(self.pass_command(pass_name))
+        if entry["stderr"]:
+            raise CheckError("Your submitted code has some errors!", entry["stderr"])
+        return entry["stdout"]
+
+    def run(self, command_prefix: List[str]):
+        self.get_submitted_file()
+        command = command_prefix + [self.submitted_file_path]
+        self.submitted_processed_code = self.try_process(command)
+
+# values of the ELF specification used by the checks
+ET_REL = 1
+ET_EXEC = 2
+ET_DYN = 3
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_FUNC = 2
+STT_SECTION = 3
+STT_FILE = 4
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STB_WEAK = 2
+SHN_UNDEF = 0
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+STT_NAMES = {STT_NOTYPE: "NOTYPE", STT_OBJECT: "OBJECT", STT_FUNC: "FUNC", STT_SECTION: "SECTION", STT_FILE: "FILE"}
+STB_NAMES = {STB_LOCAL: "LOCAL", STB_GLOBAL: "GLOBAL", STB_WEAK: "WEAK"}
+
+class ELFFormatError(Exception):
+    """
+    Raised by ELFFile.parse for a file it does not read: not ELF64 little-endian, or malformed
+    """
+
+class ELFSection():
+    __slots__ = ("name", "type", "address", "offset", "size")
 
-        return "\n".join(new_lines).strip()
+    def __init__(self, name: str, type: int, address: int, offset: int, size: int):
+        self.name = name
+        self.type = type
+        self.address = address
+        self.offset = offset
+        self.size = size
+
+class ELFSymbol():
+    """
+    The attributes of a symbol the checks use
+    """
+    __slots__ = ("index", "name", "value", "size", "type", "binding", "shndx", "section", "section_name")
+
+    def __init__(self, index: int, name: str, value: int, size: int, type: int, binding: int, shndx: int,
+                 sections: List[ELFSection]):
+        self.index = index
+        self.name = name
+        self.value = value
+        self.size = size
+        self.type = type
+        self.binding = binding
+        self.shndx = shndx
+        # None for undefined, absolute and common symbols
+        defined = 0 < shndx < len(sections)
+        self.section = sections[shndx] if defined else None
+        self.section_name = self.section.name if defined else "(no section)"
+
+class ELFFile():
+    """
+    The type, sections and symbols of an ELF file, symbols in lief's order (.dynsym, then .symtab).
+    `parse` decodes the headers, the section table and the symbol tables of an ELF64
+    little-endian file with struct, `from_lief` converts a lief binary for the other files.
+    """
+    def __init__(self, file_type: int, sections: List[ELFSection], symbols: List[ELFSymbol]):
+        self.file_type = file_type
+        self.sections = sections
+        self.symbols = symbols
+
+    @classmethod
+    def parse(cls, memory: memoryview) -> "ELFFile":
+        if len(memory) < 64 or memory[:4] != b"\x7fELF":
+            raise ELFFormatError("not an ELF file")
+        if memory[4:7] != b"\x02\x01\x01":
+            raise ELFFormatError("not ELF64 little-endian")
+        file_type = struct.unpack_from("<H", memory, 16)[0]
+        shoff, = struct.unpack_from("<Q", memory, 40)
+        shentsize, shnum, shstrndx = struct.unpack_from("<HHH", memory, 58)
+        if shnum == 0:
+            raise ELFFormatError("no section table")
+        if shentsize != 64 or shoff + shnum * 64 > len(memory) or shstrndx >= shnum:
+            raise ELFFormatError("malformed section table")
+
+        # sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link, sh_info, sh_addralign, sh_entsize
+        headers = [struct.unpack_from("<IIQQQQIIQQ", memory, shoff + index * 64) for index in range(shnum)]
+        for header in headers:
+            if header[1] != SHT_NOBITS and header[4] + header[5] > len(memory):
+                raise ELFFormatError("section out of the file")
+
+        def strings(index: int) -> bytes:
+            offset, size = headers[index][4], headers[index][5]
+            return memory[offset:offset + size].tobytes()
+
+        def string(table: bytes, offset: int) -> str:
+            end = table.find(b"\0", offset)
+            if offset >= len(table) or end == -1:
+                raise ELFFormatError("name out of the string table")
+            return table[offset:end].decode("utf-8", errors="replace")
+
+        section_names = strings(shstrndx)
+        sections = [ELFSection(string(section_names, header[0]), header[1], header[3], header[4], header[5])
+                    for header in headers]
+
+        symbols = []
+        for table_type in (SHT_DYNSYM, SHT_SYMTAB):
+            for header in headers:
+                if header[1] != table_type:
+                    continue
+                if header[9] != 24 or header[6] >= shnum:
+                    raise ELFFormatError("malformed symbol table")
+                names = strings(header[6])
+                for offset in range(header[4], header[4] + header[5] - 23, 24):
+                    name, info, _, shndx, value, size = struct.unpack_from("<IBBHQQ", memory, offset)
+                    symbols.append(ELFSymbol(len(symbols), string(names, name), value, size,
+                                             info & 0xf, info >> 4, shndx, sections))
+        return cls(file_type, sections, symbols)
+
+    @classmethod
+    def from_lief(cls, binary) -> "ELFFile":
+        sections = [ELFSection(section.name, int(section.type), section.virtual_address, section.offset, section.size)
+                    for section in binary.sections]
+        symbols = [ELFSymbol(index, symbol.name, symbol.value, symbol.size, int(symbol.type), int(symbol.binding),
+                             symbol.shndx, sections)
+                   for index, symbol in enumerate(binary.symbols)]
+        return cls(int(binary.header.file_type), sections, symbols)
+
+class SymbolIndex():
+    """
+    The symbols of a binary, indexed once instead of scanned in every check.
+    A name maps to its first symbol (in ELFFile order), as the scans of the checks did,
+    the names are sorted for prefix lookups (`printf@` matches `printf@GLIBC_2.2.5`) and the
+    symbols are grouped by section name.
+    """
+    def __init__(self, elf: ELFFile):
+        self.sections = elf.sections
+        self.section_names = [section.name for section in elf.sections]
+        self.symbols = elf.symbols
+        self.by_name = {}
+        self.by_section = {}
+        for symbol in self.symbols:
+            self.by_name.setdefault(symbol.name, symbol)
+            self.by_section.setdefault(symbol.section_name, []).append(symbol)
+        self.sorted_names = sorted(self.by_name)
+
+    def get(self, name: str) -> ELFSymbol:
+        return self.by_name.get(name)
+
+    def first_with_prefix(self, prefix: str) -> ELFSymbol:
+        """
+        The first symbol (in ELFFile order) whose name starts with prefix
+        """
+        first = None
+        position = bisect.bisect_left(self.sorted_names, prefix)
+        while position < len(self.sorted_names) and self.sorted_names[position].startswith(prefix):
+            symbol = self.by_name[self.sorted_names[position]]
+            if first is None or symbol.index < first.index:
+                first = symbol
+            position += 1
+        return first
+
+    def in_sections(self, prefix: str) -> List[ELFSymbol]:
+        """
+        The symbols of every section whose name starts with prefix, in ELFFile order
+        """
+        symbols = [symbol for name, symbols in self.by_section.items() if name.startswith(prefix) for symbol in symbols]
+        return sorted(symbols, key=lambda symbol: symbol.index)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_sha256(path: str, offset: int = 0) -> str:
+    """
+    sha256 digest of a file from offset, read in fixed-size chunks.
+    With the toolchain cache (daemon and batch mode) the digest is kept per
+    (device, inode, mtime, ctime, size, offset), so a file which did not change since
+    its last check is not read again by any checker process. The ctime can not be
+    set by the owner of the file, unlike the mtime.
+    """
+    with open(path, 'rb') as f:
+        key = None
+        if toolchain_cache is not None:
+            stat = os.fstat(f.fileno())
+            identity = f"sha256:{stat.st_dev}:{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_ctime_ns}:{stat.st_size}:{offset}"
+            key = hashlib.sha256(identity.encode()).hexdigest()
+            cached = toolchain_cache.get(key)
+            if cached is not None:
+                return cached[0].decode()
+
+        hasher = hashlib.sha256()
+        f.seek(offset)
+        buffer = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while size := f.readinto(buffer):
+            hasher.update(view[:size])
+
+    digest = hasher.hexdigest()
+    if key is not None:
+        toolchain_cache.put(key, digest.encode(), b"")
+    return digest
+
+PATCH_DIFF_CHUNK_SIZE = 64 * 1024
+PATCH_DIFF_MAX_BYTES = 32
+
+# (offset, size, name) of the fields of Elf64_Ehdr, Elf64_Phdr and Elf64_Shdr
+EHDR_FIELDS = [
+    (0, 1, "e_ident[EI_MAG0]"), (1, 1, "e_ident[EI_MAG1]"), (2, 1, "e_ident[EI_MAG2]"), (3, 1, "e_ident[EI_MAG3]"),
+    (4, 1, "e_ident[EI_CLASS]"), (5, 1, "e_ident[EI_DATA]"), (6, 1, "e_ident[EI_VERSION]"),
+    (7, 1, "e_ident[EI_OSABI]"), (8, 1, "e_ident[EI_ABIVERSION]"), (9, 7, "e_ident[EI_PAD]"),
+    (16, 2, "e_type"), (18, 2, "e_machine"), (20, 4, "e_version"), (24, 8, "e_entry"),
+    (32, 8, "e_phoff"), (40, 8, "e_shoff"), (48, 4, "e_flags"), (52, 2, "e_ehsize"),
+    (54, 2, "e_phentsize"), (56, 2, "e_phnum"), (58, 2, "e_shentsize"), (60, 2, "e_shnum"), (62, 2, "e_shstrndx"),
+]
+PHDR_FIELDS = [
+    (0, 4, "p_type"), (4, 4, "p_flags"), (8, 8, "p_offset"), (16, 8, "p_vaddr"),
+    (24, 8, "p_paddr"), (32, 8, "p_filesz"), (40, 8, "p_memsz"), (48, 8, "p_align"),
+]
+SHDR_FIELDS = [
+    (0, 4, "sh_name"), (4, 4, "sh_type"), (8, 8, "sh_flags"), (16, 8, "sh_addr"), (24, 8, "sh_offset"),
+    (32, 8, "sh_size"), (40, 4, "sh_link"), (44, 4, "sh_info"), (48, 8, "sh_addralign"), (56, 8, "sh_entsize"),
+]
+
+def differing_offsets(a, b, limit: int) -> List[int]:
+    """
+    The first `limit` offsets where the buffers a and b differ, up to the shorter one.
+    They are compared chunk by chunk and equal chunks are skipped, the bytes of a
+    differing chunk are compared with NumPy when it is installed.
+    """
+    offsets = []
+    length = min(len(a), len(b))
+    for start in range(0, length, PATCH_DIFF_CHUNK_SIZE):
+        end = min(start + PATCH_DIFF_CHUNK_SIZE, length)
+        left, right = a[start:end], b[start:end]
+        if left == right:
+            continue
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            found = numpy.flatnonzero(numpy.frombuffer(left, numpy.uint8) != numpy.frombuffer(right, numpy.uint8))
+            offsets += (found[:limit - len(offsets)] + start).tolist()
+        else:
+            found = (index for index in range(len(left)) if left[index] != right[index])
+            offsets += [start + index for _, index in zip(range(limit - len(offsets)), found)]
+        if len(offsets) >= limit:
+            break
+    return offsets
 
-    def run(self, command_prefix: List[str]):
-        self.get_submitted_file()
-        command = command_prefix + [self.submitted_file_path]
-        self.submitted_processed_code = self.try_process(command)
+def elf_fields(memory) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, name) of the header fields, the program/section header fields and the section
+    contents of an ELF64 file, sorted. Tables outside of the file are left out, so this also
+    describes the broken files of the patch levels.
+    """
+    fields = [(offset, offset + size, name) for offset, size, name in EHDR_FIELDS]
+    if len(memory) < 64:
+        return fields
+    phoff, shoff = struct.unpack_from("<QQ", memory, 32)
+    phentsize, phnum, shentsize, shnum = struct.unpack_from("<HHHH", memory, 54)
+    if phentsize == 56 and phoff + phnum * 56 <= len(memory):
+        for index in range(phnum):
+            fields += [(phoff + index * 56 + offset, phoff + index * 56 + offset + size, f"Elf64_Phdr[{index}].{name}")
+                       for offset, size, name in PHDR_FIELDS]
+    if shentsize == 64 and shoff + shnum * 64 <= len(memory):
+        try:
+            names = [section.name for section in ELFFile.parse(memory).sections]
+        except ELFFormatError:
+            names = [f"[{index}]" for index in range(shnum)]
+        for index in range(shnum):
+            fields += [(shoff + index * 64 + offset, shoff + index * 64 + offset + size, f"Elf64_Shdr[{index}].{name}")
+                       for offset, size, name in SHDR_FIELDS]
+            section_type, _, _, offset, size = struct.unpack_from("<IQQQQ", memory, shoff + index * 64 + 4)
+            if section_type != SHT_NOBITS and size and offset + size <= len(memory):
+                fields.append((offset, offset + size, f"section {names[index]}"))
+    return sorted(fields)
 
 """
 A base class for ELF related challenges
@@ -581,200 +2180,210 @@ class ELFBase():
         submitted_file = input('filename> ')
         self.submitted_file_path = pathlib.Path(submitted_file).resolve()
         if not check_file_exists(self.submitted_file_path):
-            print("File not found !")
-            sys.exit(1)
+            raise CheckError("File not found !")
 
         print_split_line()
     
-    def check_hash(self, correct: str, offset = None):
+    def check_hash(self, correct: str, offset = None, reference = None) -> CheckResult:
         """
-        check the correct hash of the submitted file
+        check the correct hash of the submitted file, from offset if given.
+        On failure the bytes changed from the given file `reference` are reported.
         """
-        if not offset:
-            with open(self.submitted_file_path, 'rb') as f:
-                submitted_hash = hashlib.sha256(f.read()).hexdigest()
-        
-        else:
-            with open(self.submitted_file_path, 'rb') as f:
-                f.seek(offset)
-                submitted_hash = hashlib.sha256(f.read()).hexdigest()
-        
-        return submitted_hash == correct
-
-    def check_function(self, func_name: str, section: str):
+        offset = offset or 0
+        submitted_hash = file_sha256(self.submitted_file_path, offset)
+        if submitted_hash != correct:
+            diagnostic = self.patch_report(reference) if reference and check_file_exists(reference) else ""
+            return CheckResult(False, "The hash of the binary is not correct! Maybe you have patched the wrong bytes?", diagnostic)
+        return CheckResult(True)
+
+    def patch_report(self, reference: pathlib.Path) -> str:
         """
-        check if func_name in section
+        The bytes of the submitted file which differ from the given file, by ELF field
         """
-        for symbol in self.binary.symbols:
-            if symbol.name == func_name:
-                if symbol.section.name == section:
-                    if symbol.type == lief.ELF.SYMBOL_TYPES.FUNC:
-                        return True
-                    else:
-                        print(f"`{func_name}` is not a function !")
-                        return False
+        with open(reference, 'rb') as f:
+            given = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with given:
+            offsets = differing_offsets(given, self.image, PATCH_DIFF_MAX_BYTES)
+            fields = elf_fields(self.memory)
+            starts = [field[0] for field in fields]
+
+            # consecutive changed bytes of the same field are reported together
+            groups = []
+            for offset in offsets:
+                position = bisect.bisect_right(starts, offset) - 1
+                field = fields[position] if position >= 0 and offset < fields[position][1] else None
+                if groups and groups[-1][0] == field and groups[-1][2] == offset:
+                    groups[-1][2] += 1
                 else:
-                    print(f"`{func_name}` is not in `{section}`, but in `{symbol.section.name}` !")
-                    return False
-
-        print(f"`{func_name}` not found !")
-        return False
+                    groups.append([field, offset, offset + 1])
+
+            lines = []
+            for field, start, end in groups:
+                if field is None:
+                    name = "(no ELF structure)"
+                elif field[0] != start or field[1] - field[0] > 8:
+                    name = f"{field[2]} + {hex(start - field[0])}"
+                else:
+                    name = field[2]
+                lines.append(f"  {hex(start)}: {name}: {given[start:end].hex(' ')} -> {self.image[start:end].hex(' ')}")
+            if len(given) != len(self.image):
+                lines.append(f"  your file is {len(self.image)} bytes, the given file is {len(given)} bytes")
+
+        if not lines:
+            return f"Your file has the same bytes as the given `{reference.name}`."
+        header = f"Compared to the given `{reference.name}`, you changed:"
+        if len(offsets) == PATCH_DIFF_MAX_BYTES:
+            header = f"Compared to the given `{reference.name}`, you changed (the first {PATCH_DIFF_MAX_BYTES} bytes):"
+        return "\n".join([header] + lines)
+
+    def check_function(self, func_name: str, section: str) -> CheckResult:
+        """
+        check if func_name in section
+        """
+        symbol = self.symbols.get(func_name)
+        if symbol is None:
+            return CheckResult(False, f"`{func_name}` not found !")
+        if symbol.section_name != section:
+            return CheckResult(False, f"`{func_name}` is not in `{section}`, but in `{symbol.section_name}` !")
+        if symbol.type != STT_FUNC:
+            return CheckResult(False, f"`{func_name}` is not a function !")
+        return CheckResult(True)
 
     def check_symbol(self, symbol_name: str, symbol_value = None, symbol_size = None, symbol_type = None,
                             symbol_bind = None, symbol_ndx = None,
                             external:bool = False, check_prefix = False,
-                            check_not_exist = False) -> bool:
-        symbol = None
+                            check_not_exist = False) -> CheckResult:
         if check_prefix:
-            for s in self.binary.symbols:
-                if s.name.startswith(symbol_name):
-                    symbol = self.binary.get_symbol(s.name)
-                    break
+            symbol = self.symbols.first_with_prefix(symbol_name)
         else:
-            symbol = self.binary.get_symbol(symbol_name)
+            symbol = self.symbols.get(symbol_name)
 
         if symbol:
             if check_not_exist:
-                print(f"Symbol {symbol.name} should not exist here!")
-                return False
+                return CheckResult(False, f"Symbol {symbol.name} should not exist here!")
 
             if symbol_value:
                 if symbol.value != symbol_value:
-                    print(f"Symbol {symbol_name}'s value is {hex(symbol.value)}, not {hex(symbol_value)} !")
-                    return False
+                    return CheckResult(False, f"Symbol {symbol_name}'s value is {hex(symbol.value)}, not {hex(symbol_value)} !")
             if symbol_size:
                 if symbol.size != symbol_size:
-                    print(f"Symbol {symbol_name}'s size is {hex(symbol.size)}, not {hex(symbol_size)} !")
-                    return False
-            if symbol_type:
+                    return CheckResult(False, f"Symbol {symbol_name}'s size is {hex(symbol.size)}, not {hex(symbol_size)} !")
+            if symbol_type is not None:
                 if symbol.type != symbol_type:
-                    print(f"Symbol {symbol_name}'s type is {symbol.type}, not {symbol_type} !")
-                    return False
-            if symbol_bind:
+                    return CheckResult(False, f"Symbol {symbol_name}'s type is {STT_NAMES.get(symbol.type, symbol.type)}, not {STT_NAMES.get(symbol_type, symbol_type)} !")
+            if symbol_bind is not None:
                 if symbol.binding != symbol_bind:
-                    print(f"Symbol {symbol_name}'s bind is {symbol.binding}, not {symbol_bind} !")
-                    return False
+                    return CheckResult(False, f"Symbol {symbol_name}'s bind is {STB_NAMES.get(symbol.binding, symbol.binding)}, not {STB_NAMES.get(symbol_bind, symbol_bind)} !")
             if symbol_ndx:
                 if symbol.shndx != symbol_ndx:
-                    print(f"Symbol {symbol_name}'s ndx is {symbol.ndx}, not {symbol_ndx} !")
-                    return False
+                    return CheckResult(False, f"Symbol {symbol_name}'s ndx is {symbol.shndx}, not {symbol_ndx} !")
             if external:
-                if symbol.shndx != lief.ELF.SYMBOL_SECTION_INDEX.UNDEF.value:
-                    print(f"Symbol {symbol_name} is not external !")
-                    return False
-            return True
+                if symbol.shndx != SHN_UNDEF:
+                    return CheckResult(False, f"Symbol {symbol_name} is not external !")
+            return CheckResult(True)
         
         else:
             if check_not_exist:
-                return True
+                return CheckResult(True)
             
-            print(f"Can not find symbol {symbol_name} in the ELF.")
-            return False
+            return CheckResult(False, f"Can not find symbol {symbol_name} in the ELF.")
 
 
-    def check_section_data(self, section_name: str, data_name: str, value):
-        for symbol in self.binary.symbols:
-            if symbol.name == data_name:
-                if symbol.section.name == section_name:
-                    if symbol.type == lief.ELF.SYMBOL_TYPES.OBJECT:
-                        symbol_data = self.get_memory_data(symbol.section.content, symbol.value, symbol.size)
-                        symbol_data = int.from_bytes(symbol_data, byteorder='little')
-                        if symbol_data == value:
-                            return True
-                        else:
-                            print(f"`{data_name}` should hold {hex(value)}, not {hex(symbol_data)}!")
-                            return False
-                    elif symbol.type == lief.ELF.SYMBOL_TYPES.FUNC:
-                        if self.binary_type == lief.ELF.E_TYPE.RELOCATABLE:
-                            function_prologue = self.get_memory_data(symbol.section.content, symbol.value, 4)
-                        elif self.binary_type == lief.ELF.E_TYPE.EXECUTABLE or self.binary_type == lief.ELF.E_TYPE.DYNAMIC:
-                            section_vaddr = symbol.section.virtual_address
-                            symbol_vaddr = symbol.value
-                            offset = symbol_vaddr - section_vaddr
-                            function_prologue = self.get_memory_data(symbol.section.content, offset, 4)
-
-                        if function_prologue == value:
-                            return True
-                        else:
-                            print(f"Function `{data_name}`'s prologue should be `{value}`! Not `{function_prologue}`!")
-                            return False
-                    else:
-                        print(f"`{data_name}` is not a variable or function !")
-                        return False
-                else:
-                    print(f"`{data_name}` is not in `{section_name}`, but in `{symbol.section.name}` !")
-                    return False
-                
-        print(f"`{data_name}` not found !")
-        return False
+    def check_section_data(self, section_name: str, data_name: str, value) -> CheckResult:
+        symbol = self.symbols.get(data_name)
+        if symbol is None:
+            return CheckResult(False, f"`{data_name}` not found !")
+        if symbol.section_name != section_name:
+            return CheckResult(False, f"`{data_name}` is not in `{section_name}`, but in `{symbol.section_name}` !")
+
+        if symbol.type == STT_OBJECT:
+            symbol_data = self.get_memory_data(self.section_content(symbol.section), symbol.value, symbol.size)
+            symbol_data = int.from_bytes(symbol_data, byteorder='little')
+            if symbol_data == value:
+                return CheckResult(True)
+            else:
+                return CheckResult(False, f"`{data_name}` should hold {hex(value)}, not {hex(symbol_data)}!")
+        elif symbol.type == STT_FUNC:
+            if self.binary_type == ET_REL:
+                function_prologue = self.get_memory_data(self.section_content(symbol.section), symbol.value, 4)
+            elif self.binary_type == ET_EXEC or self.binary_type == ET_DYN:
+                section_vaddr = symbol.section.address
+                symbol_vaddr = symbol.value
+                offset = symbol_vaddr - section_vaddr
+                function_prologue = self.get_memory_data(self.section_content(symbol.section), offset, 4)
+
+            if function_prologue == value:
+                return CheckResult(True)
+            else:
+                return CheckResult(False, f"Function `{data_name}`'s prologue should be `{value}`! Not `{function_prologue}`!")
+        else:
+            return CheckResult(False, f"`{data_name}` is not a variable or function !")
 
-    def check_bss(self, bss_name: str):
+    def check_bss(self, bss_name: str) -> CheckResult:
         """
         check if bss_name in bss
         """
-        for symbol in self.binary.symbols:
-            if symbol.name == bss_name:
-                if symbol.type == lief.ELF.SYMBOL_TYPES.OBJECT:
-                    if symbol.section.name == ".bss":
-                        return True
-                    else:
-                        print(f"`{bss_name}` is not in .bss, but in `{symbol.section.name}` with value `{symbol.value}` !")
-                        return False
-                else:
-                    print(f"`{bss_name}` is not a variable !")
-                    return False
-                
-        print(f"`{bss_name}` not found !")
-        return False
-
-    def check_data(self, data_name: str, value: int):
+        symbol = self.symbols.get(bss_name)
+        if symbol is None:
+            return CheckResult(False, f"`{bss_name}` not found !")
+        if symbol.type != STT_OBJECT:
+            return CheckResult(False, f"`{bss_name}` is not a variable !")
+        if symbol.section_name != ".bss":
+            return CheckResult(False, f"`{bss_name}` is not in .bss, but in `{symbol.section_name}` with value `{symbol.value}` !")
+        return CheckResult(True)
+
+    def check_data(self, data_name: str, value: int) -> CheckResult:
         """
         check if data_name in data
         """
-        for symbol in self.binary.symbols:
-            if symbol.name == data_name:
-                if symbol.type == lief.ELF.SYMBOL_TYPES.OBJECT:
-                    if symbol.section.name == ".data":
-                        symbol_data = self.get_memory_data(symbol.section.content, symbol.value, symbol.size)
-                        symbol_data = int.from_bytes(symbol_data, byteorder='little')
-                        if symbol_data == value:
-                            return True
-                        else:
-                            print(f"`{data_name}` should hold {hex(value)}, not {hex(symbol_data)}!")
-                            return False
-                    else:
-                        print(f"`{data_name}` is not in .data, but in `{symbol.section.name}` with value `{symbol.value}` !")
-                        return False
-                else:
-                    print(f"`{data_name}` is not a variable !")
-                    return False
-                
-        print(f"`{data_name}` not found !")
-        return False
-
-    def check_rodata(self, rodata_content: str):
+        symbol = self.symbols.get(data_name)
+        if symbol is None:
+            return CheckResult(False, f"`{data_name}` not found !")
+        if symbol.type != STT_OBJECT:
+            return CheckResult(False, f"`{data_name}` is not a variable !")
+        if symbol.section_name != ".data":
+            return CheckResult(False, f"`{data_name}` is not in .data, but in `{symbol.section_name}` with value `{symbol.value}` !")
+        symbol_data = self.get_memory_data(self.section_content(symbol.section), symbol.value, symbol.size)
+        symbol_data = int.from_bytes(symbol_data, byteorder='little')
+        if symbol_data != value:
+            return CheckResult(False, f"`{data_name}` should hold {hex(value)}, not {hex(symbol_data)}!")
+        return CheckResult(True)
+
+    def check_rodata(self, rodata_content: str) -> CheckResult:
         """
         check if rodata_name in rodata
         """
-        for symbol in self.binary.symbols:
-            if symbol.type == lief.ELF.SYMBOL_TYPES.OBJECT and \
-                symbol.section.name.startswith(".rodata"):
-                symbol_data = self.get_memory_data(symbol.section.content, symbol.value, symbol.size)
+        for symbol in self.symbols.in_sections(".rodata"):
+            if symbol.type == STT_OBJECT:
+                symbol_data = self.get_memory_data(self.section_content(symbol.section), symbol.value, symbol.size)
                 
                 if isinstance(rodata_content, str):
                     symbol_data = symbol_data.decode('utf-8').strip().rstrip('\x00')
                     if rodata_content == symbol_data:
-                        return True
+                        return CheckResult(True)
 
         # if there is no symbol in rodata
-        for section in self.binary.sections:
-            if section.name.startswith(".rodata"):
-                section_data = self.get_memory_data(section.content, 0, section.size)
-                if rodata_content in section_data.decode('utf-8'):
-                    return True
+        for section, name in zip(self.symbols.sections, self.symbols.section_names):
+            if name.startswith(".rodata") and self.section_find(section, rodata_content.encode('utf-8')):
+                return CheckResult(True)
 
-        print(f"`{rodata_content}` not found !")
-        return False
+        return CheckResult(False, f"`{rodata_content}` not found !")
+
+    def section_content(self, section) -> memoryview:
+        """
+        The content of a section as a view of the mapped file, empty for NOBITS sections (.bss)
+        """
+        if section.type == SHT_NOBITS:
+            return self.memory[0:0]
+        return self.memory[section.offset:section.offset + section.size]
+
+    def section_find(self, section, needle: bytes) -> bool:
+        """
+        Search the content of a section in the mapped file, without copying it
+        """
+        if section.type == SHT_NOBITS:
+            return False
+        return self.image.find(needle, section.offset, section.offset + section.size) != -1
 
     def get_memory_data(self, memory, offset, size) -> bytes:
         """
@@ -784,13 +2393,25 @@ class ELFBase():
 
     def run(self):
         self.get_submitted_file()
-        binary = lief.parse(str(self.submitted_file_path))
-        if isinstance(binary, lief.ELF.Binary):
-            self.binary = binary
-            self.binary_type = binary.header.file_type
-        else:
-            print("Your submitted file is not correct !")
-            sys.exit(1)
+        # section contents are read from the mapped file, lief would copy them on every access
+        with open(self.submitted_file_path, 'rb') as f:
+            try:
+                self.image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CheckError("Your submitted file is not correct !")
+        self.memory = memoryview(self.image)
+
+        try:
+            elf = ELFFile.parse(self.memory)
+        except ELFFormatError:
+            # lief is only imported for the files ELFFile.parse does not read
+            import lief
+            binary = lief.parse(str(self.submitted_file_path))
+            if not isinstance(binary, lief.ELF.Binary):
+                raise CheckError("Your submitted file is not correct !")
+            elf = ELFFile.from_lief(binary)
+        self.binary_type = elf.file_type
+        self.symbols = SymbolIndex(elf)
 
 def get_preprocess_description(preprocessed_code):
     preprocess_description = description(f"""
@@ -972,8 +2593,10 @@ def get_elf_structure_description():
     """)
     return elf_description
 
+split_line = "=" * 60
+
 def print_split_line():
-    print("=" * 60)
+    print(split_line)
 
 
 
@@ -1005,17 +2628,16 @@ class IntroLevel1(ELFBase):
 
         print(challenge_description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
-        if not (self.binary_type == lief.ELF.E_TYPE.EXECUTABLE or self.binary_type == lief.ELF.E_TYPE.DYNAMIC):
-            print("The type of the binary should be ELF executable file!")
-            sys.exit(1)
-        get_sesame()
+        if not (self.binary_type == ET_EXEC or self.binary_type == ET_DYN):
+            return CheckResult(False, "The type of the binary should be ELF executable file!")
+        return CheckResult(True)
 
 class IntroLevel2(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
-        self.given_code = pathlib.Path(__file__).parent.resolve() / "./level2.c"
+        self.given_code = challenge_dir / "./level2.c"
         self.description = get_preprocess_description(self.given_code)
 
         challenge_description = description(f"""
@@ -1030,20 +2652,18 @@ class IntroLevel2(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
         print_split_line()
-        self.check_macro_define(["STUDENT_COUNT", "STUDENT_PASS_GRADE"])
-        self.check_constant_macro_use_cnt(["STUDENT_COUNT", "STUDENT_PASS_GRADE"], [3, 2])
-        if self.check_preprocess():
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        return self.check_macro_define(["STUDENT_COUNT", "STUDENT_PASS_GRADE"]) \
+            and self.check_constant_macro_use_cnt(["STUDENT_COUNT", "STUDENT_PASS_GRADE"], [3, 2]) \
+            and self.check_preprocess()
 
 class IntroLevel3(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
-        self.given_code = pathlib.Path(__file__).parent.resolve() / "./level3.c"
+        self.given_code = challenge_dir / "./level3.c"
         self.description = get_preprocess_description(self.given_code)
 
         challenge_description = description(f"""
@@ -1060,20 +2680,18 @@ class IntroLevel3(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
         print_split_line()
-        self.check_macro_define(["SOFTWARE_VERSION", "SOFTWARE_NAME", "AUTHOR", "BANNER"])
-        self.check_constant_macro_use_cnt(["SOFTWARE_VERSION", "SOFTWARE_NAME", "AUTHOR", "BANNER"], [1, 1, 1, 1])
-        if self.check_preprocess():
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        return self.check_macro_define(["SOFTWARE_VERSION", "SOFTWARE_NAME", "AUTHOR", "BANNER"]) \
+            and self.check_constant_macro_use_cnt(["SOFTWARE_VERSION", "SOFTWARE_NAME", "AUTHOR", "BANNER"], [1, 1, 1, 1]) \
+            and self.check_preprocess()
 
 class IntroLevel4(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
-        self.given_code = pathlib.Path(__file__).parent.resolve() / "./level4.c"
+        self.given_code = challenge_dir / "./level4.c"
         self.description = get_preprocess_description(self.given_code)
 
         challenge_description = description(f"""
@@ -1090,21 +2708,19 @@ class IntroLevel4(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
         print_split_line()
-        self.check_macro_define(["FUNC", "VAR"])
-        self.check_function_macro_use_cnt(["FUNC", "VAR"], [4, 4])
-        if self.check_preprocess():
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        return self.check_macro_define(["FUNC", "VAR"]) \
+            and self.check_function_macro_use_cnt(["FUNC", "VAR"], [4, 4]) \
+            and self.check_preprocess()
 
 
 class IntroLevel5(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
-        self.given_code = pathlib.Path(__file__).parent.resolve() / "./level5.c"
+        self.given_code = challenge_dir / "./level5.c"
         self.description = get_preprocess_description(self.given_code)
 
         challenge_description = description(f"""
@@ -1131,26 +2747,24 @@ class IntroLevel5(PreprocessAnalyzeBase):
         self.description += extra_description 
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
         print_split_line()
-        self.check_macro_define(["HANDLE_ERROR"])
-        self.check_function_macro_use_cnt(["HANDLE_ERROR"], [1])
-        self.check_func_macro_implementation(["HANDLE_ERROR"], ["while"])
-        if self.check_preprocess(remove_empty_line = True):
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        return self.check_macro_define(["HANDLE_ERROR"]) \
+            and self.check_function_macro_use_cnt(["HANDLE_ERROR"], [1]) \
+            and self.check_func_macro_implementation(["HANDLE_ERROR"], ["while"]) \
+            and self.check_preprocess(remove_empty_line = True)
 
 
 class IntroLevel6(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
         self.given_code = [
-            pathlib.Path(__file__).parent.resolve() / "./level6-1.c", 
-            pathlib.Path(__file__).parent.resolve() / "./level6-2.c", 
-            pathlib.Path(__file__).parent.resolve() / "./level6-3.c", 
-            pathlib.Path(__file__).parent.resolve() / "./level6-4.c"
+            challenge_dir / "./level6-1.c", 
+            challenge_dir / "./level6-2.c", 
+            challenge_dir / "./level6-3.c", 
+            challenge_dir / "./level6-4.c"
         ]
         self.given_code = [str(path) for path in self.given_code]
         self.description = get_preprocess_description(self.given_code)
@@ -1175,22 +2789,21 @@ class IntroLevel6(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
-        self.check_preprocess(defined_macros = [{"name": "VERSION", "value": "1"}], check_target=self.given_code[0])
-        self.check_preprocess(defined_macros = [{"name": "VERSION", "value": "2"}], check_target=self.given_code[1])
-        self.check_preprocess(defined_macros = [{"name": "VERSION", "value": "3"}], check_target=self.given_code[2])
-        self.check_preprocess(defined_macros = [{"name": "VERSION", "value": "1"}, {"name": "DEBUG", "value": None}], check_target=self.given_code[3])
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_preprocess_variants([
+            ([{"name": "VERSION", "value": "1"}], self.given_code[0]),
+            ([{"name": "VERSION", "value": "2"}], self.given_code[1]),
+            ([{"name": "VERSION", "value": "3"}], self.given_code[2]),
+            ([{"name": "VERSION", "value": "1"}, {"name": "DEBUG", "value": None}], self.given_code[3])
+        ])
 
 
 class IntroLevel7(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
-        self.given_code = pathlib.Path(__file__).parent.resolve() / "./level7.c"
+        self.given_code = challenge_dir / "./level7.c"
         self.description = get_preprocess_description(self.given_code)
 
         challenge_description = description(f"""
@@ -1208,29 +2821,26 @@ class IntroLevel7(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run()
         
-        if not all([
-            self.check_directive("#include", 3),
-            self.check_line_num(max_line_num = 25)
-        ]):
-            print("Your submitted code is not correct !")
-            sys.exit(1)
-        
-        self.check_preprocess(remove_empty_line = True)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        result = CheckScheduler().run([
+            lambda: self.check_directive("#include", 3),
+            lambda: self.check_line_num(max_line_num = 25),
+            lambda: self.check_preprocess(remove_empty_line = True)
+        ])
+        if not result:
+            result.reason += "\nYour submitted code is not correct !"
+        return result
 
 class IntroLevel8(PreprocessAnalyzeBase):
     def __init__(self):
         super().__init__()
         self.given_code = [
-            pathlib.Path(__file__).parent.resolve() / "./level8.c", 
-            pathlib.Path(__file__).parent.resolve() / "./level8_1.h", 
-            pathlib.Path(__file__).parent.resolve() / "./level8_2.h"
+            challenge_dir / "./level8.c", 
+            challenge_dir / "./level8_1.h", 
+            challenge_dir / "./level8_2.h"
         ]
         self.given_code = [str(path) for path in self.given_code]
         self.description = description(f"""
@@ -1253,21 +2863,19 @@ class IntroLevel8(PreprocessAnalyzeBase):
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.get_input_file()
         input_path = pathlib.Path(self.input_path)
         if input_path.name != "solve_level8.h":
-            print("The file name of your submitted file should be `solve_level8.h` !")
-            sys.exit(1)
+            return CheckResult(False, "The file name of your submitted file should be `solve_level8.h` !")
         
         include_dir = input_path.parent.resolve()
         try:
-            process = subprocess.Popen(["clang-15", "-E", "-P", "-x", "c", "-I", include_dir, self.given_code[0]], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr = run_command(["clang-15", "-E", "-P", "-x", "c", "-I", include_dir, self.given_code[0]])
+        except CheckError:
+            raise
         except:
-            print("Can not run clang-15 -E -P on your submitted code !")
-            sys.exit(1)
-        process.wait()
-        stdout, stderr = process.communicate()
+            raise CheckError("Can not run clang-15 -E -P on your submitted code !")
         if stderr:
             print(stderr.decode('utf-8').strip())
             print("Your submitted code has some errors, can not be compiled !")
@@ -1285,145 +2893,100 @@ class IntroLevel8(PreprocessAnalyzeBase):
         if preprocessed_submitted.count(submitted_code) < 2:
             stdout, stderr = try_compile(["clang-15", "-S", "-x", "c", "-I", include_dir, "-o", "-", self.given_code[0]])
             if stderr:
-                print("Your submitted code is not correct !")
-                print(stderr)
-                sys.exit(1)
+                return CheckResult(False, "Your submitted code is not correct !", stderr)
 
         else:
-            print("Your submitted code is not correct !")
-            print("There are some repulicated definitions in your submitted code !")
-            sys.exit(1)
+            return CheckResult(False, "Your submitted code is not correct !\nThere are some repulicated definitions in your submitted code !")
 
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame() 
+        return CheckResult(True)
 
 class IntroLevel9(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ast"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ast"
         super().__init__(self.given_original_path, self.given_processed_path)
         self.description = get_compilation_description(self.given_original_path)
         challenge_description = get_ast_description()
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-Xclang", "-ast-dump", "-fsyntax-only", "-fno-color-diagnostics"])
 
-        given_trimmed = self.trim_ast(self.given_processed_code).strip()
-        submitted_trimmed = self.trim_ast(self.submitted_processed_code).strip()
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel10(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ast"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ast"
         super().__init__(self.given_original_path, self.given_processed_path)
         self.description = get_compilation_description(self.given_original_path)
         challenge_description = get_ast_description()
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-Xclang", "-ast-dump", "-fsyntax-only", "-fno-color-diagnostics"])
 
-        given_trimmed = self.trim_ast(self.given_processed_code).strip()
-        submitted_trimmed = self.trim_ast(self.submitted_processed_code).strip()
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel11(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ast"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ast"
         super().__init__(self.given_original_path, self.given_processed_path)
         self.description = get_compilation_description(self.given_original_path)
         challenge_description = get_ast_description()
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-Xclang", "-ast-dump", "-fsyntax-only", "-fno-color-diagnostics"])
 
-        given_trimmed = self.trim_ast(self.given_processed_code).strip()
-        submitted_trimmed = self.trim_ast(self.submitted_processed_code).strip()
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel12(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ast"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ast"
         super().__init__(self.given_original_path, self.given_processed_path)
         self.description = get_compilation_description(self.given_original_path)
         challenge_description = get_ast_description()
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-Xclang", "-ast-dump", "-fsyntax-only", "-fno-color-diagnostics"])
 
-        given_trimmed = self.trim_ast(self.given_processed_code).strip()
-        submitted_trimmed = self.trim_ast(self.submitted_processed_code).strip()
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel13(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ast"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ast"
         super().__init__(self.given_original_path, self.given_processed_path)
         self.description = get_compilation_description(self.given_original_path)
         challenge_description = get_ast_description()
         self.description += challenge_description
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-Xclang", "-ast-dump", "-fsyntax-only", "-fno-color-diagnostics"])
 
-        given_trimmed = self.trim_ast(self.given_processed_code).strip()
-        submitted_trimmed = self.trim_ast(self.submitted_processed_code).strip()
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel14(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1436,25 +2999,17 @@ class IntroLevel14(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel15(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1467,24 +3022,16 @@ class IntroLevel15(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel16(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1497,24 +3044,16 @@ class IntroLevel16(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel17(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1530,24 +3069,16 @@ class IntroLevel17(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel18(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1559,24 +3090,16 @@ class IntroLevel18(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel19(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1589,25 +3112,17 @@ class IntroLevel19(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel20(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1621,24 +3136,16 @@ class IntroLevel20(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel21(CompileBase):
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         compilation_description = get_compilation_description(self.given_original_path)
         challenge_description = get_llvmir_description()
@@ -1654,25 +3161,19 @@ class IntroLevel21(CompileBase):
         self.description = compilation_description + challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         self.run(["clang-15", "-x", "c", "-S", "-c", "-emit-llvm", "-o", "-"])
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel22(CompileBase):
+    has_pass_table = True
+
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./opt_level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.ll"
+        self.given_processed_path = challenge_dir / f"./opt_level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         challenge_description = get_llvmpass_description()
         task_description = get_llvmpass_task_description()
@@ -1691,27 +3192,20 @@ class IntroLevel22(CompileBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         pass_name = input("LLVM Pass Name> ")
         pass_name = self.pass_sanitizer(pass_name)
-        command = ["opt-15", "-S", f"-{pass_name}", "-o", "-", self.given_original_path]
-        self.submitted_processed_code = self.try_process(command)
+        self.submitted_processed_code = self.run_pass(pass_name)
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 class IntroLevel23(CompileBase):
+    has_pass_table = True
+
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./opt_level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.ll"
+        self.given_processed_path = challenge_dir / f"./opt_level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         challenge_description = get_llvmpass_description()
         task_description = get_llvmpass_task_description()
@@ -1734,28 +3228,21 @@ class IntroLevel23(CompileBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         pass_name = input("LLVM Pass Name> ")
         pass_name = self.pass_sanitizer(pass_name)
-        command = ["opt-15", "-S", f"-{pass_name}", "-o", "-", self.given_original_path]
-        self.submitted_processed_code = self.try_process(command)
-
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
+        self.submitted_processed_code = self.run_pass(pass_name)
 
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel24(CompileBase):
+    has_pass_table = True
+
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./opt_level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.ll"
+        self.given_processed_path = challenge_dir / f"./opt_level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         challenge_description = get_llvmpass_description()
         task_description = get_llvmpass_task_description()
@@ -1779,28 +3266,21 @@ class IntroLevel24(CompileBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         # analyze the submitted code
         pass_name = input("LLVM Pass Name> ")
         pass_name = self.pass_sanitizer(pass_name)
-        command = ["opt-15", "-S", f"-{pass_name}", "-o", "-", self.given_original_path]
-        self.submitted_processed_code = self.try_process(command)
+        self.submitted_processed_code = self.run_pass(pass_name)
 
-        given_trimmed = self.trim_llvmir(self.given_processed_code)
-        submitted_trimmed = self.trim_llvmir(self.submitted_processed_code)
-
-        if given_trimmed == submitted_trimmed:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_trimmed, given_trimmed)
-            sys.exit(1)
+        return self.check_normalized()
 
 
 class IntroLevel25(CompileBase):
+    golden_tool = "llc-15"
+
     def __init__(self):
-        self.given_original_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.c"
-        self.given_processed_path = pathlib.Path(__file__).parent.resolve() / f"./level{level}.ll"
+        self.given_original_path = challenge_dir / f"./level{level}.c"
+        self.given_processed_path = challenge_dir / f"./level{level}.ll"
         super().__init__(self.given_original_path, self.given_processed_path)
         challenge_description = description(f"""
             Congratulations!
@@ -1829,15 +3309,27 @@ class IntroLevel25(CompileBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
-        submitted_asm = self.get_submitted_file()
-        given_asm = self.try_process(["llc-15", "-march=x86-64", "-filetype=asm", "-x86-asm-syntax=intel", "-o", "-", self.given_processed_path])
-        if submitted_asm == given_asm:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
-        else:
-            self.diff_error(submitted_asm, given_asm)
-            sys.exit(1)
+    def golden_path(self) -> pathlib.Path:
+        return challenge_dir / f"./level{level}.s.golden"
+
+    def golden_source(self) -> str:
+        return self.try_process(["llc-15", "-march=x86-64", "-filetype=asm", "-x86-asm-syntax=intel", "-o", "-", self.given_processed_path])
+
+    def parse(self, code: str) -> AsmModule:
+        return parse_asm(code)
+
+    def compare(self, submitted: AsmModule, given: AsmModule) -> str:
+        return compare_asm(submitted, given)
+
+    def given_model(self) -> AsmModule:
+        # the normalized golden assembly parses to the same model
+        if self.given_parsed is None:
+            self.given_parsed = parse_asm(self.load_golden()["text"])
+        return self.given_parsed
+
+    def check(self) -> CheckResult:
+        self.submitted_processed_code = self.get_submitted_file()
+        return self.check_normalized()
 
 
 class IntroLevel26(ELFBase):
@@ -1869,24 +3361,18 @@ class IntroLevel26(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
         
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        return CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("foo", ".text"),
             self.check_function("bar", ".text"),
             self.check_bss("global_var")
-        ]):
-            sys.exit(1)
-
-        else:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        ])
 
 class IntroLevel27(ELFBase):
     def __init__(self):
@@ -1921,14 +3407,13 @@ class IntroLevel27(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
         
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        return CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("foo", ".text"),
             self.check_function("bar", ".text"),
@@ -1936,12 +3421,7 @@ class IntroLevel27(ELFBase):
             self.check_data("global_var", 0xdeadbeef),
             self.check_data("global_var2", 0xbeabdeef),
             self.check_rodata("HelloWorld")
-        ]):
-            sys.exit(1)
-
-        else:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        ])
 
 
 class IntroLevel28(ELFBase):
@@ -1969,26 +3449,20 @@ class IntroLevel28(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
         
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        return CheckResult.all([
             self.check_function("main", ".ucastext"),
             self.check_function("foo", ".ucastext"),
             self.check_function("bar", ".ucastext"),
             self.check_bss("uninitialized_global_2"),
             self.check_section_data(".ucasbss", "uninitialized_global", 0x00000000),
             self.check_section_data(".ucasdata", "global_var", 0xdeadbeef)
-        ]):
-            sys.exit(1)
-
-        else:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+        ])
 
 
 class IntroLevel29(ELFBase):
@@ -2041,27 +3515,22 @@ class IntroLevel29(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        result = CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("bar", ".text"),
             self.check_bss("uninitialized_global"),
             self.check_data("global_var", 0xdeadbeef)
-        ]):
-            sys.exit(1)
+        ])
+        if not result:
+            return result
         
-        if not self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d"):
-            print("The hash of the binary is not correct! Maybe you have patched the wrong bytes?")
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d", reference=challenge_dir / f"level{level}.o")
 
 
 class IntroLevel30(ELFBase):
@@ -2143,27 +3612,22 @@ class IntroLevel30(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        result = CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("bar", ".text"),
             self.check_bss("uninitialized_global"),
             self.check_data("global_var", 0xdeadbeef)
-        ]):
-            sys.exit(1)
+        ])
+        if not result:
+            return result
         
-        if not self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d"):
-            print("The hash of the binary is not correct! Maybe you have patched the wrong bytes?")
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d", reference=challenge_dir / f"level{level}.o")
 
 
 class IntroLevel31(ELFBase):
@@ -2226,27 +3690,22 @@ class IntroLevel31(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        result = CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("bar", ".text"),
             self.check_bss("uninitialized_global"),
             self.check_data("global_var", 0xdeadbeef)
-        ]):
-            sys.exit(1)
+        ])
+        if not result:
+            return result
         
-        if not self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d"):
-            print("The hash of the binary is not correct! Maybe you have patched the wrong bytes?")
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d", reference=challenge_dir / f"level{level}.o")
 
 class IntroLevel32(ELFBase):
     def __init__(self):
@@ -2296,29 +3755,24 @@ class IntroLevel32(ELFBase):
         self.description = challenge_description + task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        result = CheckResult.all([
             self.check_function("main", ".text"),
             self.check_function("bar", ".text"),
             self.check_bss("uninitialized_global"),
             self.check_data("global_var", 0xdeadbeef),
             # 55 48 89 e5:  push rbp; mov rbp, rsp, which is function prologue
             self.check_section_data(".text", "bar", b"\x55\x48\x89\xe5")
-        ]):
-            sys.exit(1)
+        ])
+        if not result:
+            return result
         
-        if not self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d"):
-            print("The hash of the binary is not correct! Maybe you have patched the wrong bytes?")
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_hash("3542f053022283ffe994b03adf88cfbee1f4e50b3bc7b9d587b75b177681eb9d", reference=challenge_dir / f"level{level}.o")
 
 class IntroLevel33(ELFBase):
     def __init__(self):
@@ -2368,27 +3822,22 @@ class IntroLevel33(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
-            self.check_symbol("foo", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, symbol_bind = lief.ELF.SYMBOL_BINDINGS.GLOBAL),
-            self.check_symbol("main", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, symbol_bind = lief.ELF.SYMBOL_BINDINGS.GLOBAL),
-            self.check_symbol("bar", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, symbol_bind = lief.ELF.SYMBOL_BINDINGS.LOCAL),
-            self.check_symbol("global_var", symbol_type = lief.ELF.SYMBOL_TYPES.OBJECT, symbol_bind = lief.ELF.SYMBOL_BINDINGS.LOCAL),
+        return CheckResult.all([
+            self.check_symbol("foo", symbol_type = STT_FUNC, symbol_bind = STB_GLOBAL),
+            self.check_symbol("main", symbol_type = STT_FUNC, symbol_bind = STB_GLOBAL),
+            self.check_symbol("bar", symbol_type = STT_FUNC, symbol_bind = STB_LOCAL),
+            self.check_symbol("global_var", symbol_type = STT_OBJECT, symbol_bind = STB_LOCAL),
             self.check_bss("global_var"),
-            self.check_symbol("global_var_2", symbol_type = lief.ELF.SYMBOL_TYPES.OBJECT, symbol_bind = lief.ELF.SYMBOL_BINDINGS.GLOBAL),
+            self.check_symbol("global_var_2", symbol_type = STT_OBJECT, symbol_bind = STB_GLOBAL),
             self.check_data("global_var_2", 0xdeadbeef),
-            self.check_symbol("myprintf", symbol_bind = lief.ELF.SYMBOL_BINDINGS.GLOBAL, external = True)
-        ]):
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+            self.check_symbol("myprintf", symbol_bind = STB_GLOBAL, external = True)
+        ])
 
 class IntroLevel34(ELFBase):
     def __init__(self):
@@ -2437,21 +3886,16 @@ class IntroLevel34(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.RELOCATABLE):
-            print("The type of the binary should be relocatable object file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_REL):
+            return CheckResult(False, "The type of the binary should be relocatable object file!")
 
-        if not all([
+        return CheckResult.all([
             self.check_section_data(".text", "bar", b"\x55\x48\x89\xe5"),
             self.check_data("global_var", 0xdeadbeef),
-        ]):
-            sys.exit(1)
-
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        ])
 
 
 class IntroLevel35(ELFBase):
@@ -2514,25 +3958,20 @@ class IntroLevel35(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.EXECUTABLE or self.binary_type == lief.ELF.E_TYPE.DYNAMIC):
-            print("The type of the binary should be ELF executable file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_EXEC or self.binary_type == ET_DYN):
+            return CheckResult(False, "The type of the binary should be ELF executable file!")
 
-        if not all([
-            self.check_symbol("main", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC),
-            self.check_symbol("global_var_b", symbol_type = lief.ELF.SYMBOL_TYPES.OBJECT),
-            self.check_symbol("swap", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC),
-            self.check_symbol("printf@", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, check_prefix = True),
-            self.check_symbol("_start", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, check_not_exist = True),
+        return CheckResult.all([
+            self.check_symbol("main", symbol_type = STT_FUNC),
+            self.check_symbol("global_var_b", symbol_type = STT_OBJECT),
+            self.check_symbol("swap", symbol_type = STT_FUNC),
+            self.check_symbol("printf@", symbol_type = STT_FUNC, check_prefix = True),
+            self.check_symbol("_start", symbol_type = STT_FUNC, check_not_exist = True),
             self.check_symbol("__libc_start_main@", check_prefix = True, check_not_exist = True)
-        ]):
-            sys.exit(1)
-        
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        ])
 
 
 class IntroLevel36(ELFBase):
@@ -2579,26 +4018,21 @@ class IntroLevel36(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.EXECUTABLE or self.binary_type == lief.ELF.E_TYPE.DYNAMIC):
-            print("The type of the binary should be ELF executable file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_EXEC or self.binary_type == ET_DYN):
+            return CheckResult(False, "The type of the binary should be ELF executable file!")
 
-        if not all([
-            self.check_symbol("main", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC),
+        return CheckResult.all([
+            self.check_symbol("main", symbol_type = STT_FUNC),
             self.check_section_data(".text", "main", b"\x55\x48\x89\xe5"),
-            self.check_symbol("global_var_b", symbol_type = lief.ELF.SYMBOL_TYPES.OBJECT),
-            self.check_symbol("swap", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC),
-            self.check_symbol("printf@", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, check_prefix = True),
-            self.check_symbol("_start", symbol_type = lief.ELF.SYMBOL_TYPES.FUNC, check_not_exist = True),
+            self.check_symbol("global_var_b", symbol_type = STT_OBJECT),
+            self.check_symbol("swap", symbol_type = STT_FUNC),
+            self.check_symbol("printf@", symbol_type = STT_FUNC, check_prefix = True),
+            self.check_symbol("_start", symbol_type = STT_FUNC, check_not_exist = True),
             self.check_symbol("__libc_start_main@", check_prefix = True, check_not_exist = True)
-        ]):
-            sys.exit(1)
-        
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        ])
 
 class IntroLevel37(ELFBase):
     def __init__(self):
@@ -2630,7 +4064,7 @@ class IntroLevel37(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.get_submitted_file()
         with open(self.submitted_file_path, "r") as f:
             content = f.read().strip()
@@ -2644,15 +4078,12 @@ class IntroLevel37(ELFBase):
 
         if len(results) < 4:
             print(results)
-            print("You should submit at least 4 files!")
-            sys.exit(1)
+            return CheckResult(False, "You should submit at least 4 files!")
 
         if not all([result in candidate_pools for result in results]):
-            print("You have submitted some invalid files!")
-            sys.exit(1)
+            return CheckResult(False, "You have submitted some invalid files!")
         
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return CheckResult(True)
 
 class IntroLevel38(ELFBase):
     def __init__(self):
@@ -2721,17 +4152,20 @@ class IntroLevel38(ELFBase):
         
         return result
 
-    def error(self, submit, ground_truth):
-        print("The virtual address range is not correct!")
-        print(f"Your range: {submit}")
-        print(f"Ground truth: {hex(ground_truth[0])}-{hex(ground_truth[1])}")
-        sys.exit(1)
+    def error(self, submit, ground_truth) -> CheckResult:
+        return CheckResult(False, "\n".join([
+            "The virtual address range is not correct!",
+            f"Your range: {submit}",
+            f"Ground truth: {hex(ground_truth[0])}-{hex(ground_truth[1])}"
+        ]))
 
-    def check(self):
+    def check(self) -> CheckResult:
+        output.flush()
         self.child_pid = os.fork()
 
         if self.child_pid == 0:
             print_split_line()
+            output.flush()
             os.execve("/challenge/level38", ["/challenge/level38"], {})
         else:
             time.sleep(0.5)
@@ -2743,8 +4177,7 @@ class IntroLevel38(ELFBase):
             
             ranges = content.split("\n")
             if len(ranges) != 4:
-                print("You should submit 4 virtual address ranges!")
-                sys.exit(1)
+                return CheckResult(False, "You should submit 4 virtual address ranges!")
             
             for i in range(len(ranges)):
                 r = ranges[i]
@@ -2753,27 +4186,26 @@ class IntroLevel38(ELFBase):
 
                 if i == 0:
                     if not (range_start == ground_truth["code"][0] and range_end == ground_truth["code"][1]):
-                        self.error(r, ground_truth["code"])
+                        return self.error(r, ground_truth["code"])
                     else:
                         continue
                 if i == 1:
                     if not (range_start == ground_truth["data"][0] and range_end == ground_truth["data"][1]):
-                        self.error(r, ground_truth["data"])
+                        return self.error(r, ground_truth["data"])
                     else:
                         continue
                 if i == 2:
                     if not (range_start == ground_truth["stack"][0] and range_end == ground_truth["stack"][1]):
-                        self.error(r, ground_truth["stack"])
+                        return self.error(r, ground_truth["stack"])
                     else:
                         continue
                 if i == 3:
                     if not (range_start == ground_truth["heap"][0] and range_end == ground_truth["heap"][1]):
-                        self.error(r, ground_truth["heap"])
+                        return self.error(r, ground_truth["heap"])
                     else:
                         continue
             
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
             
     def __del__(self):
         if self.child_pid == 0:
@@ -2825,21 +4257,13 @@ class IntroLevel39(ELFBase):
         self.description = task_description + hint
         print(self.description)
 
-    def check(self):
+    def check(self) -> CheckResult:
         self.run()
 
-        if not (self.binary_type == lief.ELF.E_TYPE.EXECUTABLE or self.binary_type == lief.ELF.E_TYPE.DYNAMIC):
-            print("The type of the binary should be ELF executable file!")
-            sys.exit(1)
+        if not (self.binary_type == ET_EXEC or self.binary_type == ET_DYN):
+            return CheckResult(False, "The type of the binary should be ELF executable file!")
 
-        if not all([
-            self.check_hash("4228c8043f79c624e6c71af887eb372d8c89d6446453cef5d740038dcb5b28df")
-        ]):
-            print("The hash of the binary is not correct! Maybe you have patched the wrong bytes?")
-            sys.exit(1)
-        
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return self.check_hash("4228c8043f79c624e6c71af887eb372d8c89d6446453cef5d740038dcb5b28df", reference=challenge_dir / f"level{level}")
 
 
 class IntroLevel40(ELFBase):
@@ -2894,17 +4318,17 @@ class IntroLevel40(ELFBase):
         
         return result
 
-    def error(self, submit, ground_truth):
-        print("The virtual address range is not correct!")
-        print(f"Your range: {submit}")
-        print(f"Ground truth: {hex(ground_truth[0])}-{hex(ground_truth[1])}")
-        sys.exit(1)
+    def error(self, submit, ground_truth) -> CheckResult:
+        return CheckResult(False, "\n".join([
+            "The virtual address range is not correct!",
+            f"Your range: {submit}",
+            f"Ground truth: {hex(ground_truth[0])}-{hex(ground_truth[1])}"
+        ]))
 
-    def check(self):
+    def check(self) -> CheckResult:
         pid = input("PID > ")
         if not pid.isdigit():
-            print("PID should be a number!")
-            sys.exit(1)
+            return CheckResult(False, "PID should be a number!")
 
         ground_truth = self.ground_truth(pid)
         
@@ -2914,8 +4338,7 @@ class IntroLevel40(ELFBase):
         
         ranges = content.split("\n")
         if len(ranges) != 2:
-            print("You should submit 2 virtual address ranges!")
-            sys.exit(1)
+            return CheckResult(False, "You should submit 2 virtual address ranges!")
 
         for i in range(len(ranges)):
             r = ranges[i]
@@ -2924,17 +4347,16 @@ class IntroLevel40(ELFBase):
 
             if i == 0:
                 if not (range_start == ground_truth["libc"][0] and range_end == ground_truth["libc"][1]):
-                    self.error(r, ground_truth["libc"])
+                    return self.error(r, ground_truth["libc"])
                 else:
                     continue
             if i == 1:
                 if not (range_start == ground_truth["liblevel40"][0] and range_end == ground_truth["liblevel40"][1]):
-                    self.error(r, ground_truth["liblevel40"])
+                    return self.error(r, ground_truth["liblevel40"])
                 else:
                     continue
         
-        print("Congratulations! You have passed this challenge! Following is your sesame:")
-        get_sesame()
+        return CheckResult(True)
 
 
 class IntroLevel41(ELFBase):
@@ -3051,7 +4473,7 @@ class IntroLevel41(ELFBase):
         self.description = task_description + hint
         print(self.description)
     
-    def check(self):
+    def check(self) -> CheckResult:
         process = subprocess.Popen("/challenge/level41", stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
         outputs = ""
@@ -3076,15 +4498,12 @@ class IntroLevel41(ELFBase):
         outputs += remaining_output
         
         if errors:
-            print("Program errors:", errors.strip())
-            sys.exit(1)
+            return CheckResult(False, "Program errors: " + errors.strip())
         
         if "Congratulation!" in outputs:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
         else:
-            print("You failed to pass this challenge!")
-            sys.exit(1)
+            return CheckResult(False, "You failed to pass this challenge!")
 
 
 class IntroLevel42(ELFBase):
@@ -3160,7 +4579,7 @@ class IntroLevel42(ELFBase):
         self.description = task_description + hint
         print(self.description)
     
-    def check(self):
+    def check(self) -> CheckResult:
         process = subprocess.Popen("/challenge/level42", stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
         outputs = ""
@@ -3180,15 +4599,12 @@ class IntroLevel42(ELFBase):
         outputs += remaining_output
         
         if errors:
-            print("Program errors:", errors.strip())
-            sys.exit(1)
+            return CheckResult(False, "Program errors: " + errors.strip())
         
         if "Congratulation!" in outputs:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
         else:
-            print("You failed to pass this challenge!")
-            sys.exit(1)
+            return CheckResult(False, "You failed to pass this challenge!")
 
 class IntroLevel43(ELFBase):
     def __init__(self):
@@ -3244,7 +4660,7 @@ class IntroLevel43(ELFBase):
         self.description = task_description + hint
         print(self.description)
     
-    def check(self):
+    def check(self) -> CheckResult:
         process = subprocess.Popen("/challenge/level43", stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
         outputs = ""
@@ -3264,15 +4680,12 @@ class IntroLevel43(ELFBase):
         outputs += remaining_output
         
         if errors:
-            print("Program errors:", errors.strip())
-            sys.exit(1)
+            return CheckResult(False, "Program errors: " + errors.strip())
         
         if "Congratulation!" in outputs:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
         else:
-            print("You failed to pass this challenge!")
-            sys.exit(1)
+            return CheckResult(False, "You failed to pass this challenge!")
 
 class IntroLevel44(ELFBase):
     def __init__(self):
@@ -3297,7 +4710,7 @@ class IntroLevel44(ELFBase):
         self.description = task_description + hint
         print(self.description)
     
-    def check(self):
+    def check(self) -> CheckResult:
         print("Write your arguments here. For example, if you want to run your program like `./level44 1 2 3`, you should input `1 2 3` here.")
         args = input("args > ")
         args = args.strip().split(" ")
@@ -3317,15 +4730,12 @@ class IntroLevel44(ELFBase):
         outputs += remaining_output
         
         if errors:
-            print("Program errors:", errors.strip())
-            sys.exit(1)
+            return CheckResult(False, "Program errors: " + errors.strip())
         
         if "Congratulation!" in outputs:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
         else:
-            print("You failed to pass this challenge!")
-            sys.exit(1)
+            return CheckResult(False, "You failed to pass this challenge!")
 
 class IntroLevel45(ELFBase):
     def __init__(self):
@@ -3346,7 +4756,7 @@ class IntroLevel45(ELFBase):
         self.description = task_description + hint
         print(self.description)
     
-    def check(self):
+    def check(self) -> CheckResult:
         process = subprocess.Popen(f"/challenge/level{level}", stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
         outputs = ""
@@ -3366,16 +4776,433 @@ class IntroLevel45(ELFBase):
         outputs += remaining_output
         
         if errors:
-            print("Program errors:", errors.strip())
-            sys.exit(1)
+            return CheckResult(False, "Program errors: " + errors.strip())
         
         if "Congratulation!" in outputs:
-            print("Congratulations! You have passed this challenge! Following is your sesame:")
-            get_sesame()
+            return CheckResult(True)
         else:
-            print("You failed to pass this challenge!")
+            return CheckResult(False, "You failed to pass this challenge!")
+
+
+"""
+    Following are the entry points: local check, checker daemon and its thin client
+"""
+
+# never taken from the environment: `run` is executed with privileges by untrusted users
+DAEMON_SOCKET = "/run/intro-checker.sock"
+GIVEN_ARTIFACT_SUFFIXES = [".c", ".h", ".ast", ".ll", ".golden", ".passes"]
+
+def discover_levels(root: str) -> Dict[int, pathlib.Path]:
+    """
+    Find all level directories (directories with a `.config`) under root
+    """
+    root = pathlib.Path(root).resolve()
+    levels = {}
+    for config_file in [root / ".config"] + sorted(root.glob("*/level*/.config")):
+        if config_file.is_file():
+            levels[int(config_file.read_text().strip())] = config_file.parent
+    return levels
+
+def privileged() -> bool:
+    """
+    True when `run` is executed by a user with the privileges of its owner (setuid)
+    """
+    return os.getuid() != os.geteuid() or os.getgid() != os.getegid()
+
+def level_class(level: int) -> type:
+    """
+    Look up the challenge class of a level
+    """
+    return globals()[f"IntroLevel{level}"]
+
+def run_check(challenge) -> CheckResult:
+    try:
+        result = challenge.check()
+        output.flush()
+        return result
+    except CheckError as e:
+        return e.result
+
+def report_result(result: CheckResult) -> int:
+    """
+    Print the verdict of a check, give the sesame if passed, return the exit code
+    """
+    try:
+        if result.diagnostic:
+            print(result.diagnostic)
+        if result.reason:
+            print(result.reason)
+        output.flush()
+    except CheckError as e:
+        result = e.result
+        print(result.reason)
+        output.close()
+
+    if not result:
+        return 1
+    print("Congratulations! You have passed this challenge! Following is your sesame:")
+    get_sesame()
+    return 0
+
+def check_challenge() -> int:
+    """
+    Run the check of current level in this process, return the exit code
+    """
+    setup_completion()
+    try:
+        challenge = level_class(level)()
+    except CheckError as e:
+        return report_result(e.result)
+    return report_result(run_check(challenge))
+
+class CheckerDaemon():
+    """
+    A long-lived checker listening on a unix socket.
+    Modules and given artifacts are loaded once, every connection is served by
+    a forked child which takes over the stdin/stdout/stderr and the working directory
+    of the client, so the interactive prompts work as if `run` was executed directly.
+    """
+    def __init__(self, root: str, socket_path: str = DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self.levels = discover_levels(root)
+        if not self.levels:
+            print(f"No level found in {root} !")
             sys.exit(1)
 
+    def warm_up(self):
+        for served_level, level_dir in self.levels.items():
+            level_class(served_level)
+            for path in level_dir.iterdir():
+                if path.suffix in GIVEN_ARTIFACT_SUFFIXES and path.is_file():
+                    given_artifacts[str(path)] = path.read_text()
+        # dlopen the grammar once, children inherit the loaded language
+        if os.path.exists(c_parsers.language_path):
+            c_parsers.get_language()
+        preload_golden_files(self.levels)
+
+    def serve_forever(self):
+        self.warm_up()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o666)
+        server.listen(128)
+        # children are reaped automatically
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        print(f"Serving levels {sorted(self.levels)} on {self.socket_path}")
+        output.flush()
+
+        if toolchain_pool is not None:
+            server.settimeout(POOL_WARM_INTERVAL)
+        while True:
+            if toolchain_pool is not None and toolchain_pool.warm_up_due():
+                toolchain_pool.warm_up()
+            try:
+                conn, _ = server.accept()
+            except (InterruptedError, socket.timeout):
+                continue
+            if os.fork() == 0:
+                server.close()
+                self.handle_connection(conn)
+            conn.close()
+
+    def handle_connection(self, conn: socket.socket):
+        """
+        Runs in the forked child, never returns
+        """
+        global level, challenge_dir
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        code = 1
+        try:
+            # only `run` itself (executed with our privileges) may ask for a check,
+            # the level it sends is then the one of its directory
+            _, peer_uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+            if peer_uid != os.geteuid():
+                os._exit(1)
+            # stdin, stdout, stderr and the working directory of the client
+            message, fds, _, _ = socket.recv_fds(conn, 64, 4)
+            if len(fds) != 4:
+                os._exit(1)
+            os.fchdir(fds[3])
+            os.close(fds[3])
+            for target, fd in enumerate(fds[:3]):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin = open(0, "r", closefd=False)
+            sys.stdout = open(1, "w", buffering=1, closefd=False)
+            sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+            # the client is gone (e.g. Ctrl-C), stop waiting for its input
+            def watch_client():
+                if not conn.recv(1):
+                    os._exit(1)
+            threading.Thread(target=watch_client, daemon=True).start()
+
+            requested_level = int(message.decode().strip())
+            if requested_level not in self.levels:
+                print(f"Level {requested_level} is not served by this checker !")
+            else:
+                level = requested_level
+                challenge_dir = self.levels[requested_level]
+                code = check_challenge()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            output.close()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            try:
+                conn.sendall(struct.pack("!i", code))
+            except OSError:
+                pass
+            os._exit(code)
+
+def check_via_daemon(socket_path: str = DAEMON_SOCKET) -> int:
+    """
+    Hand our stdin/stdout/stderr to the checker daemon and wait for the exit code.
+    Return None if there is no daemon running.
+    """
+    if not os.path.exists(socket_path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        return None
+
+    with client:
+        sys.stdout.flush()
+        # relative paths typed at the prompts are resolved in our working directory
+        cwd = os.open(".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            socket.send_fds(client, [f"{level}\n".encode()], [0, 1, 2, cwd])
+        finally:
+            os.close(cwd)
+        status = b""
+        while len(status) < 4:
+            try:
+                chunk = client.recv(4 - len(status))
+            except ConnectionError:
+                return 1
+            if not chunk:
+                return 1
+            status += chunk
+    return struct.unpack("!i", status)[0]
+
+def compile_levels(levels: Dict[int, pathlib.Path]):
+    """
+    Yield (level, instance) for every compilation level with a golden file or a pass table,
+    the description printed by the instance is dropped
+    """
+    global level, challenge_dir
+    for golden_level, level_dir in sorted(levels.items()):
+        challenge = level_class(golden_level)
+        if not (issubclass(challenge, CompileBase) and (challenge.has_golden or challenge.has_pass_table)):
+            continue
+        level = golden_level
+        challenge_dir = level_dir
+        output.flush()
+        with contextlib.redirect_stdout(io.StringIO()):
+            instance = challenge()
+            output.close()
+        yield golden_level, instance
+
+def preload_golden_files(levels: Dict[int, pathlib.Path]):
+    """
+    Put the golden files and pass tables of the compilation levels in given_artifacts,
+    building the missing or stale ones, before daemon children or batch workers are
+    forked: they would build them again for every check otherwise
+    """
+    for _, instance in compile_levels(levels):
+        if instance.has_golden and not (instance.golden_tool and instance.golden_tool_fingerprint() is None):
+            given_artifacts[str(instance.golden_path())] = json.dumps(instance.load_golden())
+        if instance.has_pass_table and not instance.load_pass_table():
+            pass_table = instance.build_pass_table()
+            if pass_table is not None:
+                given_artifacts[str(instance.pass_table_path())] = json.dumps(pass_table)
+
+def build_golden_files(root: str):
+    """
+    Write the normalized given code of every compilation level under root next to
+    its given .ast/.ll file, and the pass tables of the opt levels. Run it again
+    whenever a given file or the toolchain changes.
+    """
+    for golden_level, instance in compile_levels(discover_levels(root)):
+        challenge = type(instance)
+        if challenge.has_golden and challenge.golden_tool and tool_fingerprint(challenge.golden_tool) is None:
+            print(f"Level {golden_level}: {challenge.golden_tool} not found, no golden file")
+        elif challenge.has_golden:
+            golden_path = instance.golden_path()
+            golden_path.write_text(json.dumps(instance.build_golden(), indent=1) + "\n")
+            print(f"Level {golden_level}: {golden_path}")
+        if challenge.has_pass_table:
+            pass_table = instance.build_pass_table()
+            if pass_table is None:
+                print(f"Level {golden_level}: opt-15 not found, no pass table")
+                continue
+            pass_table_path = instance.pass_table_path()
+            pass_table_path.write_text(json.dumps(pass_table, indent=1) + "\n")
+            print(f"Level {golden_level}: {pass_table_path}")
+
+"""
+    Batch grading: check many submissions of one level without prompts
+"""
+
+batch_challenge = None
+batch_submission = None
+
+def batch_input(prompt: str = "") -> str:
+    # every prompt (filename, pass name, PID, ...) is answered with the submission
+    return batch_submission
+
+def init_batch_worker(batch_level: int, level_dir: pathlib.Path, quiet: bool = False):
+    """
+    Load the challenge once per worker process
+    """
+    global level, challenge_dir, batch_challenge, input
+    level = batch_level
+    challenge_dir = level_dir
+    input = batch_input
+    output.quiet = quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_challenge = level_class(level)()
+        output.close()
+
+def check_submission(submission: str) -> Dict:
+    global batch_submission
+    batch_submission = submission
+    outputs = io.StringIO()
+    result = CheckResult(False, "The checker crashed !")
+    start = time.time()
+    with contextlib.redirect_stdout(outputs), contextlib.redirect_stderr(outputs):
+        try:
+            result = run_check(batch_challenge)
+        except Exception:
+            output.close()
+            traceback.print_exc()
+        output.close()
+
+    return {
+        "level": level,
+        "submission": submission,
+        "passed": bool(result),
+        "exit_code": 0 if result else 1,
+        "reason": result.reason,
+        "diagnostic": result.diagnostic,
+        "elapsed": round(time.time() - start, 6),
+        # concurrent checks: wall time against running them one after another
+        "checks_wall": round(sum(wall for wall, _ in result.timings), 6),
+        "checks_sequential": round(sum(sequential for _, sequential in result.timings), 6),
+        "output": outputs.getvalue(),
+    }
+
+def sanitize_record(record: Dict) -> Dict:
+    """
+    Scan the text of a record for the sesame like the checker output. A record
+    containing it (e.g. a compiler error echoing /flag) is dropped, only the
+    verdict is kept.
+    """
+    for field in ("submission", "reason", "diagnostic", "output"):
+        try:
+            OutputSink().scan(record[field])
+        except CheckError as e:
+            return {
+                "level": record["level"],
+                "submission": record["submission"] if field != "submission" else "",
+                "passed": False,
+                "exit_code": 1,
+                "reason": e.result.reason,
+            }
+    return record
+
+def batch_submissions(path: str) -> List[str]:
+    """
+    A directory of submissions, or a manifest file with one submission per line.
+    Relative paths in a manifest are relative to the manifest, lines which are not
+    paths (e.g. LLVM pass names) are passed as they are.
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        return [str(p) for p in sorted(path.iterdir()) if p.is_file()]
+
+    submissions = []
+    for line in try_read_file(path).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        candidate = path.parent / line
+        submissions.append(str(candidate) if candidate.exists() else line)
+    return submissions
+
+def batch_check(batch_level: int, path: str, root: str, jobs: int = None, quiet: bool = False):
+    """
+    Check all submissions on a process pool, emit one JSON record per submission
+    """
+    levels = discover_levels(root)
+    if batch_level not in levels:
+        print(f"Can not find level {batch_level} in {root} !")
+        sys.exit(1)
+    submissions = batch_submissions(path)
+    preload_golden_files({batch_level: levels[batch_level]})
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+                                                mp_context=multiprocessing.get_context("fork"),
+                                                initializer=init_batch_worker,
+                                                initargs=(batch_level, levels[batch_level], quiet)) as executor:
+        for record in executor.map(check_submission, submissions):
+            sys.stdout.write(json.dumps(sanitize_record(record)) + "\n")
+            sys.stdout.flush()
+
+def main(argv: List[str]):
+    # the daemon, batch, golden, cache and pool options are for the operator only,
+    # they read and write files anywhere and would serve levels the student wrote
+    if argv and privileged():
+        print("The checker does not take any option, just run it !")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--daemon", metavar="ROOT", help="serve all levels under ROOT from one warm process")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="unix socket of the checker daemon")
+    parser.add_argument("--batch", metavar="PATH", help="check a directory or manifest of submissions, print JSON lines")
+    parser.add_argument("--build-golden", metavar="ROOT", help="write the normalized golden files of all levels under ROOT")
+    parser.add_argument("--level", type=int, default=level, help="level of the batch submissions")
+    parser.add_argument("--root", default=pathlib.Path(__file__).resolve().parent, help="directory containing all levels")
+    parser.add_argument("--jobs", type=int, default=None, help="number of batch worker processes")
+    parser.add_argument("--quiet", action="store_true", help="drop the checker output of batch submissions")
+    parser.add_argument("--cache", metavar="DIR", help="cache toolchain results in DIR (daemon and batch mode only)")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB", help="size bound of the toolchain cache")
+    parser.add_argument("--tool-jobs", type=int, default=None, metavar="N", help="concurrent processes per toolchain binary (daemon and batch mode only)")
+    parser.add_argument("--pool-dir", metavar="DIR", help="queue state of the toolchain pool, shared by every checker using DIR")
+    args = parser.parse_args(argv)
+
+    global toolchain_cache, toolchain_pool
+    if args.cache and (args.batch or args.daemon):
+        toolchain_cache = ToolchainCache(args.cache, args.cache_size * 1024 * 1024)
+    if args.batch or args.daemon:
+        pool_dir = args.pool_dir
+        if pool_dir is None:
+            pool_dir = tempfile.mkdtemp(prefix="toolchain-pool-")
+            atexit.register(shutil.rmtree, pool_dir, True)
+        toolchain_pool = ToolchainPool(pool_dir, args.tool_jobs or os.cpu_count() or 1)
+        toolchain_pool.warm_up()
+
+    if args.build_golden:
+        build_golden_files(args.build_golden)
+        sys.exit(0)
+
+    if args.batch:
+        batch_check(args.level, args.batch, args.root, args.jobs, args.quiet)
+        sys.exit(0)
+
+    if args.daemon:
+        CheckerDaemon(args.daemon, args.socket).serve_forever()
+
+    code = check_via_daemon(args.socket)
+    if code is None:
+        code = check_challenge()
+    sys.exit(code)
+
 if __name__ == "__main__":
-    challenge = globals()[f"IntroLevel{level}"]
-    challenge().check()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file